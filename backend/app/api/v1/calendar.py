@@ -9,7 +9,7 @@ import structlog
 from ...database.base import get_db
 from ...database.models import User, Calendar
 from ...middleware.auth import get_current_user
-from ...services.calendar import calendar_service
+from ...services.calendar import GoogleCalendarService, get_calendar_service
 from ...config import settings
 from ...schemas.calendar import (
     CalendarOAuthInitiate, CalendarOAuthCallback, CalendarConnection,
@@ -27,7 +27,8 @@ router = APIRouter()
 async def initiate_calendar_connection(
     request: Request,
     oauth_data: Optional[CalendarOAuthInitiate] = None,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calendar_service: GoogleCalendarService = Depends(get_calendar_service)
 ):
     """
     Initiate Google Calendar OAuth2 connection flow.
@@ -119,7 +120,8 @@ async def handle_oauth_callback_post(
     callback_data: CalendarOAuthCallback,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calendar_service: GoogleCalendarService = Depends(get_calendar_service)
 ):
     """
     Handle Google Calendar OAuth2 callback via POST (from frontend).
@@ -238,7 +240,8 @@ async def disconnect_calendar(
 async def sync_calendar(
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calendar_service: GoogleCalendarService = Depends(get_calendar_service)
 ):
     """
     Manually trigger calendar synchronization.
@@ -332,7 +335,8 @@ async def get_calendar_events(
 async def create_calendar_event(
     event_data: CalendarEventCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calendar_service: GoogleCalendarService = Depends(get_calendar_service)
 ):
     """
     Create a new calendar event.
@@ -441,7 +445,8 @@ async def update_calendar_event(
     event_id: str,
     event_data: CalendarEventUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calendar_service: GoogleCalendarService = Depends(get_calendar_service)
 ):
     """
     Update an existing calendar event.
@@ -517,7 +522,8 @@ async def update_calendar_event(
 async def delete_calendar_event(
     event_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calendar_service: GoogleCalendarService = Depends(get_calendar_service)
 ):
     """
     Delete a calendar event.
@@ -569,7 +575,8 @@ async def delete_calendar_event(
 async def get_scheduling_suggestions(
     duration_minutes: int = 60,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calendar_service: GoogleCalendarService = Depends(get_calendar_service)
 ):
     """
     Get intelligent scheduling suggestions based on user's calendar and preferences.
@@ -654,7 +661,8 @@ async def setup_calendar_watch(
     watch_request: CalendarWatchRequest,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    calendar_service: GoogleCalendarService = Depends(get_calendar_service)
 ):
     """
     Set up Google Calendar push notifications (webhook).
@@ -1,10 +1,21 @@
 """
 Celery application configuration and setup.
 """
+import asyncio
+from typing import Any, Coroutine, Optional
+
 from celery import Celery
-from celery.signals import worker_ready, worker_shutting_down
+from celery.signals import (
+    worker_ready, worker_shutting_down,
+    worker_process_init, worker_process_shutdown
+)
 import structlog
 
+try:
+    import uvloop  # Installed with uvicorn[standard]
+except ImportError:  # pragma: no cover - optional speedup
+    uvloop = None
+
 from .config import settings
 
 logger = structlog.get_logger(__name__)
@@ -100,6 +111,44 @@ def worker_shutting_down_handler(sender=None, **kwargs):
     logger.info("Celery worker shutting down", worker=sender.hostname)
 
 
+# Event loop kept alive for the lifetime of a worker process, so async task
+# bodies reuse connection pools and clients instead of rebuilding them per run
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+@worker_process_init.connect
+def worker_process_init_handler(**kwargs):
+    """Create the persistent event loop for this worker process (uvloop if available)."""
+    global _worker_loop
+    _worker_loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+
+
+@worker_process_shutdown.connect
+def worker_process_shutdown_handler(**kwargs):
+    """Release the async database pool and close the worker process event loop."""
+    global _worker_loop
+    if _worker_loop is not None:
+        from .database.base import dispose_async_engine
+        
+        _worker_loop.run_until_complete(dispose_async_engine())
+        _worker_loop.run_until_complete(_worker_loop.shutdown_asyncgens())
+        _worker_loop.close()
+        _worker_loop = None
+
+
+def run_async(coro: Coroutine[Any, Any, Any]) -> Any:
+    """
+    Run a coroutine from a synchronous Celery task.
+    
+    Uses the worker process's persistent loop when one is set up, and falls
+    back to a fresh ``asyncio.run`` loop otherwise (eager mode, solo pool).
+    """
+    if _worker_loop is None or _worker_loop.is_closed():
+        return asyncio.run(coro)
+    return _worker_loop.run_until_complete(coro)
+
+
 # Task base class with common functionality
 class BaseTask(celery_app.Task):
     """Base task class with error handling and logging."""
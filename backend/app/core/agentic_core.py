@@ -20,6 +20,10 @@ from .context_manager import ContextManager, UserContext, ContextType
 
 logger = logging.getLogger(__name__)
 
+# Bare commands that control the assistant itself
+_PAUSE_COMMANDS = frozenset({"stop", "pause", "halt"})
+_RESUME_COMMANDS = frozenset({"resume", "continue", "start"})
+
 
 @dataclass
 class AgentResponse:
@@ -70,7 +74,7 @@ class AgenticCore:
         redis_client=None
     ):
         # Initialize core components
-        self.intent_recognizer = IntentRecognizer()
+        self.intent_recognizer = IntentRecognizer(redis_client=redis_client)
         self.task_planner = TaskPlanner()
         self.context_manager = ContextManager(redis_client=redis_client)
         
@@ -139,20 +143,21 @@ class AgenticCore:
             AgentResponse with text, actions, and context updates
         """
         
-        if self.system_paused:
-            return AgentResponse(
-                text="I'm currently paused. Please say 'resume' to continue.",
-                confidence_score=1.0
-            )
-        
         try:
-            # Handle system control commands first
+            # Handle system control commands first; they are exact matches and
+            # must still work while paused so the user can resume
             if await self._handle_system_commands(text, user_id):
                 return AgentResponse(
                     text="System command processed.",
                     confidence_score=1.0
                 )
             
+            if self.system_paused:
+                return AgentResponse(
+                    text="I'm currently paused. Please say 'resume' to continue.",
+                    confidence_score=1.0
+                )
+            
             # Get user context
             user_context = await self.context_manager.get_user_context(user_id)
             
@@ -197,20 +202,17 @@ class AgenticCore:
         
         text_lower = text.lower().strip()
         
-        if text_lower in ["stop", "pause", "halt"]:
+        if text_lower in _PAUSE_COMMANDS:
             self.system_paused = True
             logger.info(f"System paused by user {user_id}")
             return True
         
-        elif text_lower in ["resume", "continue", "start"]:
+        if text_lower in _RESUME_COMMANDS:
             self.system_paused = False
             logger.info(f"System resumed by user {user_id}")
             return True
         
-        elif text_lower in ["help", "assist", "guide"]:
-            # This would be handled in response generation
-            return False
-        
+        # Help requests are handled in response generation
         return False
     
     async def _generate_response(
@@ -5,12 +5,15 @@ This module implements natural language processing pipeline with LangChain integ
 for intent classification across calendar, messaging, and task management domains.
 """
 
+import json
 import re
 from typing import Dict, List, Optional, Tuple, Any
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
 import logging
+from collections import defaultdict, deque
+from functools import lru_cache
 
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langchain_core.prompts import PromptTemplate
@@ -19,6 +22,86 @@ from pydantic import BaseModel, Field
 
 logger = logging.getLogger(__name__)
 
+# Interactions kept in each user's conversation history
+CONVERSATION_HISTORY_SIZE = 5
+
+# Seconds a user's conversation state is kept in Redis after the last turn
+CONVERSATION_STATE_TTL = 86400
+
+# Seconds after a turn during which a request of the same intent counts as its follow-up
+FOLLOW_UP_WINDOW_SECONDS = 120
+
+# Distinct normalized inputs whose pattern-based result is memoized per recognizer
+INTENT_CACHE_SIZE = 4096
+
+# Keyword groups for keyword-based intent scoring
+_CALENDAR_KEYWORDS = ("schedule", "meeting", "appointment", "calendar", "event", "book", "time")
+_CALENDAR_CREATE_WORDS = ("create", "schedule", "book", "add", "plan")
+_CALENDAR_QUERY_WORDS = ("what", "show", "check", "when", "list")
+_CALENDAR_DELETE_WORDS = ("cancel", "delete", "remove", "clear")
+_CALENDAR_RESCHEDULE_WORDS = ("reschedule", "move", "change", "postpone")
+_TASK_KEYWORDS = ("remind", "task", "todo", "remember", "don't forget")
+_TASK_CREATE_WORDS = ("remind", "add", "create", "need to")
+_TASK_QUERY_WORDS = ("what", "show", "list", "check")
+_TASK_COMPLETE_WORDS = ("done", "completed", "finished", "mark")
+_MESSAGE_KEYWORDS = ("send", "message", "text", "whatsapp")
+_SYSTEM_CONTROL_WORDS = ("stop", "pause", "halt", "help", "settings")
+
+# Whole inputs that are system commands; checked before any pattern scan
+_SYSTEM_COMMANDS = frozenset({"stop", "pause", "halt", "resume"})
+
+# One bit per distinct keyword, longest first so the scanner prefers longer matches
+_ALL_KEYWORDS = sorted(
+    {
+        word
+        for group in (
+            _CALENDAR_KEYWORDS, _CALENDAR_CREATE_WORDS, _CALENDAR_QUERY_WORDS,
+            _CALENDAR_DELETE_WORDS, _CALENDAR_RESCHEDULE_WORDS, _TASK_KEYWORDS,
+            _TASK_CREATE_WORDS, _TASK_QUERY_WORDS, _TASK_COMPLETE_WORDS,
+            _MESSAGE_KEYWORDS, _SYSTEM_CONTROL_WORDS,
+        )
+        for word in group
+    },
+    key=lambda word: (-len(word), word)
+)
+_KEYWORD_BITS = {word: 1 << index for index, word in enumerate(_ALL_KEYWORDS)}
+
+# A match also counts every keyword contained in it ("reschedule" -> "schedule"),
+# which keeps the scan equivalent to a separate substring test per keyword
+_MATCH_MASKS = {
+    word: sum(bit for other, bit in _KEYWORD_BITS.items() if other in word)
+    for word in _ALL_KEYWORDS
+}
+
+# Zero-width lookahead so matches may overlap; one left-to-right pass finds all keywords
+_KEYWORD_RE = re.compile("(?=(%s))" % "|".join(map(re.escape, _ALL_KEYWORDS)))
+
+
+def _keyword_mask(words: Tuple[str, ...]) -> int:
+    """Bitmask covering the given keywords."""
+    return sum(_KEYWORD_BITS[word] for word in set(words))
+
+
+_CALENDAR_MASK = _keyword_mask(_CALENDAR_KEYWORDS)
+_CALENDAR_CREATE_MASK = _keyword_mask(_CALENDAR_CREATE_WORDS)
+_CALENDAR_QUERY_MASK = _keyword_mask(_CALENDAR_QUERY_WORDS)
+_CALENDAR_DELETE_MASK = _keyword_mask(_CALENDAR_DELETE_WORDS)
+_CALENDAR_RESCHEDULE_MASK = _keyword_mask(_CALENDAR_RESCHEDULE_WORDS)
+_TASK_MASK = _keyword_mask(_TASK_KEYWORDS)
+_TASK_CREATE_MASK = _keyword_mask(_TASK_CREATE_WORDS)
+_TASK_QUERY_MASK = _keyword_mask(_TASK_QUERY_WORDS)
+_TASK_COMPLETE_MASK = _keyword_mask(_TASK_COMPLETE_WORDS)
+_MESSAGE_MASK = _keyword_mask(_MESSAGE_KEYWORDS)
+_SYSTEM_CONTROL_MASK = _keyword_mask(_SYSTEM_CONTROL_WORDS)
+
+
+def _scan_keywords(text: str) -> int:
+    """Return the bitmask of all keywords occurring in ``text`` (lowercase)."""
+    hits = 0
+    for match in _KEYWORD_RE.finditer(text):
+        hits |= _MATCH_MASKS[match.group(1)]
+    return hits
+
 
 class IntentType(str, Enum):
     """Enumeration of supported intent types."""
@@ -48,9 +131,9 @@ class IntentType(str, Enum):
     UNKNOWN = "unknown"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class IntentResult:
-    """Result of intent recognition."""
+    """Result of intent recognition (immutable; derive variants with ``dataclasses.replace``)."""
     
     intent: IntentType
     confidence: float
@@ -59,6 +142,34 @@ class IntentResult:
     requires_confirmation: bool = False
 
 
+# Verb groups deciding the intent within a domain, checked in order
+_CALENDAR_ACTIONS = (
+    (_CALENDAR_CREATE_MASK, IntentType.CALENDAR_CREATE.value),
+    (_CALENDAR_QUERY_MASK, IntentType.CALENDAR_QUERY.value),
+    (_CALENDAR_DELETE_MASK, IntentType.CALENDAR_DELETE.value),
+    (_CALENDAR_RESCHEDULE_MASK, IntentType.CALENDAR_RESCHEDULE.value),
+)
+_TASK_ACTIONS = (
+    (_TASK_CREATE_MASK, IntentType.TASK_CREATE.value),
+    (_TASK_QUERY_MASK, IntentType.TASK_QUERY.value),
+    (_TASK_COMPLETE_MASK, IntentType.TASK_COMPLETE.value),
+)
+
+
+# Entity extraction patterns and word lists
+_TIME_ENTITY_PATTERNS = (
+    ("time", re.compile(r"(\d{1,2}:\d{2}|\d{1,2}\s*(?:am|pm))", re.IGNORECASE)),
+    ("date", re.compile(r"(today|tomorrow|yesterday|\d{1,2}/\d{1,2}|\d{1,2}-\d{1,2})", re.IGNORECASE)),
+    ("duration", re.compile(r"(\d+\s*(?:hour|minute|day)s?)", re.IGNORECASE)),
+)
+_PEOPLE_PATTERN = re.compile(r"with\s+([A-Za-z]+(?:\s+[A-Za-z]+)?)", re.IGNORECASE)
+_LOCATION_PATTERN = re.compile(r"(?:at|in)\s+([A-Za-z\s]+?)(?:\s+(?:at|on|for)|$)", re.IGNORECASE)
+_TITLED_INTENTS = frozenset((IntentType.CALENDAR_CREATE, IntentType.TASK_CREATE))
+# Intents with no entity schema of their own; follow-ups never inherit entities into them
+_UNMERGED_INTENTS = frozenset((IntentType.UNKNOWN, IntentType.GENERAL_QUERY))
+_TITLE_SKIP_WORDS = frozenset(("schedule", "create", "add", "remind", "me", "to", "about", "a", "an", "the"))
+
+
 class IntentRecognitionOutput(BaseModel):
     """Structured output for intent recognition."""
     
@@ -76,10 +187,19 @@ class IntentRecognizer:
     and conversation state management.
     """
     
-    def __init__(self):
+    def __init__(self, redis_client=None):
+        self.redis_client = redis_client
         self.intent_patterns = self._initialize_patterns()
+        self._compiled_patterns = self._compile_patterns(self.intent_patterns)
+        # Pattern matching is a pure function of the normalized input, so repeated
+        # phrasings skip the scan; the LLM path depends on context and is not cached
+        self._cached_pattern_recognition = lru_cache(maxsize=INTENT_CACHE_SIZE)(
+            self._pattern_based_recognition
+        )
         self.context_memory: Dict[str, any] = {}
         self.conversation_state: Dict[str, any] = {}
+        # Entities remembered across turns, per user
+        self.entity_history: Dict[str, Dict[str, any]] = defaultdict(dict)
         
         # Initialize LangChain components
         self.output_parser = PydanticOutputParser(pydantic_object=IntentRecognitionOutput)
@@ -164,6 +284,25 @@ class IntentRecognizer:
             ]
         }
     
+    @staticmethod
+    def _compile_patterns(
+        intent_patterns: Dict[IntentType, List[str]]
+    ) -> List[Tuple[re.Pattern, IntentType, float]]:
+        """
+        Compile intent patterns once, ordered by confidence (highest first).
+        
+        The sort is stable, so among equally confident patterns the original
+        order still decides, and the first match is the best match.
+        """
+        compiled = [
+            # Confidence is based on pattern specificity
+            (re.compile(pattern, re.IGNORECASE), intent_type, min(0.9, 0.6 + (len(pattern) / 100)))
+            for intent_type, patterns in intent_patterns.items()
+            for pattern in patterns
+        ]
+        compiled.sort(key=lambda entry: -entry[2])
+        return compiled
+    
     def _create_intent_prompt(self) -> PromptTemplate:
         """Create the LangChain prompt template for intent recognition."""
         
@@ -229,28 +368,56 @@ class IntentRecognizer:
             # Normalize input
             normalized_input = user_input.lower().strip()
             
+            # Pick up state written by other workers, if shared through Redis
+            await self._load_conversation_state(user_id)
+            
+            # Bare system commands need no scanning
+            if normalized_input in _SYSTEM_COMMANDS:
+                result = IntentResult(
+                    intent=IntentType.SYSTEM_CONTROL,
+                    confidence=0.95,
+                    entities={},
+                    context={"method": "exact_command"}
+                )
+                self._update_conversation_state(user_id, result, user_input)
+                await self._save_conversation_state(user_id)
+                return result
+            
             # Get conversation context for this user
             user_context = self.conversation_state.get(user_id, {})
             if context:
                 user_context.update(context)
             
-            # First try pattern-based recognition for speed
-            pattern_result = self._pattern_based_recognition(normalized_input)
+            # First try pattern-based recognition for speed; cached results are
+            # shared, so hand out a copy the caller may modify
+            cached_result = self._cached_pattern_recognition(normalized_input)
+            pattern_result = replace(
+                cached_result,
+                entities=dict(cached_result.entities),
+                context=dict(cached_result.context)
+            )
             
             # If pattern matching is confident enough, use it
             if pattern_result.confidence >= 0.8:
+                pattern_result = self._merge_entity_history(user_id, pattern_result)
+                
                 # Update conversation state
                 self._update_conversation_state(user_id, pattern_result, user_input)
+                await self._save_conversation_state(user_id)
                 return pattern_result
             
             # Otherwise, use LangChain for more sophisticated analysis
-            llm_result = await self._llm_based_recognition(user_input, user_context)
+            llm_result = await self._llm_based_recognition(
+                user_input, user_context, normalized_input=normalized_input
+            )
             
             # Combine results for final decision
             final_result = self._combine_results(pattern_result, llm_result)
+            final_result = self._merge_entity_history(user_id, final_result)
             
             # Update conversation state
             self._update_conversation_state(user_id, final_result, user_input)
+            await self._save_conversation_state(user_id)
             
             logger.info(f"Intent recognized: {final_result.intent} (confidence: {final_result.confidence})")
             return final_result
@@ -270,15 +437,11 @@ class IntentRecognizer:
         best_match = None
         best_confidence = 0.0
         
-        for intent_type, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, user_input, re.IGNORECASE):
-                    # Calculate confidence based on pattern specificity
-                    confidence = min(0.9, 0.6 + (len(pattern) / 100))
-                    
-                    if confidence > best_confidence:
-                        best_confidence = confidence
-                        best_match = intent_type
+        for pattern, intent_type, confidence in self._compiled_patterns:
+            if pattern.search(user_input):
+                best_match = intent_type
+                best_confidence = confidence
+                break
         
         if best_match:
             entities = self._extract_entities(user_input, best_match)
@@ -299,7 +462,8 @@ class IntentRecognizer:
     async def _llm_based_recognition(
         self, 
         user_input: str, 
-        context: Dict[str, any]
+        context: Dict[str, any],
+        normalized_input: Optional[str] = None
     ) -> IntentResult:
         """Perform LLM-based intent recognition using LangChain."""
         
@@ -308,7 +472,9 @@ class IntentRecognizer:
             # In production, this would use OpenAI or another LLM
             
             # Simulate LLM analysis based on keywords and context
-            intent_scores = self._calculate_intent_scores(user_input, context)
+            intent_scores = self._calculate_intent_scores(
+                user_input, context, normalized_input=normalized_input
+            )
             
             best_intent = max(intent_scores.items(), key=lambda x: x[1])
             intent_type = IntentType(best_intent[0])
@@ -332,46 +498,49 @@ class IntentRecognizer:
                 context={"method": "llm_based", "error": str(e)}
             )
     
-    def _calculate_intent_scores(self, user_input: str, context: Dict[str, any]) -> Dict[str, float]:
-        """Calculate intent scores based on keywords and context."""
+    def _calculate_intent_scores(
+        self,
+        user_input: str,
+        context: Dict[str, any],
+        normalized_input: Optional[str] = None
+    ) -> Dict[str, float]:
+        """
+        Calculate intent scores based on keywords and context.
+        
+        ``normalized_input`` is the already lowercased input, when the caller has it.
+        """
         
         scores = {intent.value: 0.0 for intent in IntentType}
+        if normalized_input is None:
+            normalized_input = user_input.lower()
+        hits = _scan_keywords(normalized_input)
         
         # Calendar keywords
-        calendar_keywords = ["schedule", "meeting", "appointment", "calendar", "event", "book", "time"]
-        calendar_score = sum(1 for word in calendar_keywords if word in user_input.lower()) / len(calendar_keywords)
+        calendar_score = (hits & _CALENDAR_MASK).bit_count() / len(_CALENDAR_KEYWORDS)
         
         if calendar_score > 0:
-            if any(word in user_input.lower() for word in ["create", "schedule", "book", "add", "plan"]):
-                scores[IntentType.CALENDAR_CREATE.value] = calendar_score * 0.8
-            elif any(word in user_input.lower() for word in ["what", "show", "check", "when", "list"]):
-                scores[IntentType.CALENDAR_QUERY.value] = calendar_score * 0.8
-            elif any(word in user_input.lower() for word in ["cancel", "delete", "remove", "clear"]):
-                scores[IntentType.CALENDAR_DELETE.value] = calendar_score * 0.8
-            elif any(word in user_input.lower() for word in ["reschedule", "move", "change", "postpone"]):
-                scores[IntentType.CALENDAR_RESCHEDULE.value] = calendar_score * 0.8
+            for mask, intent in _CALENDAR_ACTIONS:
+                if hits & mask:
+                    scores[intent] = calendar_score * 0.8
+                    break
         
         # Task keywords
-        task_keywords = ["remind", "task", "todo", "remember", "don't forget"]
-        task_score = sum(1 for word in task_keywords if word in user_input.lower()) / len(task_keywords)
+        task_score = (hits & _TASK_MASK).bit_count() / len(_TASK_KEYWORDS)
         
         if task_score > 0:
-            if any(word in user_input.lower() for word in ["remind", "add", "create", "need to"]):
-                scores[IntentType.TASK_CREATE.value] = task_score * 0.8
-            elif any(word in user_input.lower() for word in ["what", "show", "list", "check"]):
-                scores[IntentType.TASK_QUERY.value] = task_score * 0.8
-            elif any(word in user_input.lower() for word in ["done", "completed", "finished", "mark"]):
-                scores[IntentType.TASK_COMPLETE.value] = task_score * 0.8
+            for mask, intent in _TASK_ACTIONS:
+                if hits & mask:
+                    scores[intent] = task_score * 0.8
+                    break
         
         # Message keywords
-        message_keywords = ["send", "message", "text", "whatsapp"]
-        message_score = sum(1 for word in message_keywords if word in user_input.lower()) / len(message_keywords)
+        message_score = (hits & _MESSAGE_MASK).bit_count() / len(_MESSAGE_KEYWORDS)
         
         if message_score > 0:
             scores[IntentType.MESSAGE_SEND.value] = message_score * 0.8
         
         # System control keywords
-        if any(word in user_input.lower() for word in ["stop", "pause", "halt", "help", "settings"]):
+        if hits & _SYSTEM_CONTROL_MASK:
             scores[IntentType.SYSTEM_CONTROL.value] = 0.9
         
         return scores
@@ -382,37 +551,28 @@ class IntentRecognizer:
         entities = {}
         
         # Extract time-related entities
-        time_patterns = {
-            "time": r"(\d{1,2}:\d{2}|\d{1,2}\s*(?:am|pm))",
-            "date": r"(today|tomorrow|yesterday|\d{1,2}/\d{1,2}|\d{1,2}-\d{1,2})",
-            "duration": r"(\d+\s*(?:hour|minute|day)s?)"
-        }
-        
-        for entity_type, pattern in time_patterns.items():
-            matches = re.findall(pattern, user_input, re.IGNORECASE)
+        for entity_type, pattern in _TIME_ENTITY_PATTERNS:
+            matches = pattern.findall(user_input)
             if matches:
                 entities[entity_type] = matches
         
         # Extract people/contacts
-        people_pattern = r"with\s+([A-Za-z]+(?:\s+[A-Za-z]+)?)"
-        people_matches = re.findall(people_pattern, user_input, re.IGNORECASE)
+        people_matches = _PEOPLE_PATTERN.findall(user_input)
         if people_matches:
             entities["people"] = people_matches
         
         # Extract locations
-        location_pattern = r"(?:at|in)\s+([A-Za-z\s]+?)(?:\s+(?:at|on|for)|$)"
-        location_matches = re.findall(location_pattern, user_input, re.IGNORECASE)
+        location_matches = _LOCATION_PATTERN.findall(user_input)
         if location_matches:
             entities["location"] = [loc.strip() for loc in location_matches]
         
         # Extract task/event titles
-        if intent_type in [IntentType.CALENDAR_CREATE, IntentType.TASK_CREATE]:
+        if intent_type in _TITLED_INTENTS:
             # Simple heuristic to extract the main subject
             words = user_input.split()
             if len(words) > 2:
                 # Skip common action words and extract the core content
-                skip_words = {"schedule", "create", "add", "remind", "me", "to", "about", "a", "an", "the"}
-                content_words = [word for word in words if word.lower() not in skip_words]
+                content_words = [word for word in words if word.lower() not in _TITLE_SKIP_WORDS]
                 if content_words:
                     entities["title"] = " ".join(content_words[:5])  # Limit to 5 words
         
@@ -443,6 +603,32 @@ class IntentRecognizer:
         else:
             return llm_result
     
+    def _is_follow_up(self, user_id: str, result: IntentResult) -> bool:
+        """Whether ``result`` continues the user's previous turn rather than starting a new request."""
+        
+        if result.intent in _UNMERGED_INTENTS:
+            return False
+        
+        state = self.conversation_state.get(user_id)
+        if not state or not state["history"]:
+            return False
+        
+        last_turn = state["history"][-1]
+        if last_turn["intent"] != result.intent.value:
+            return False
+        
+        elapsed = datetime.now() - datetime.fromisoformat(last_turn["timestamp"])
+        return elapsed <= timedelta(seconds=FOLLOW_UP_WINDOW_SECONDS)
+    
+    def _merge_entity_history(self, user_id: str, result: IntentResult) -> IntentResult:
+        """Fill a follow-up of the previous turn with entities from the ongoing request."""
+        
+        history = self.entity_history.get(user_id)
+        if not history or not self._is_follow_up(user_id, result):
+            return result
+        
+        return replace(result, entities={**history, **result.entities})
+    
     def _update_conversation_state(
         self, 
         user_id: str, 
@@ -453,14 +639,14 @@ class IntentRecognizer:
         
         if user_id not in self.conversation_state:
             self.conversation_state[user_id] = {
-                "history": [],
+                "history": deque(maxlen=CONVERSATION_HISTORY_SIZE),
                 "last_intent": None,
-                "context": {}
+                "context": self.entity_history[user_id]
             }
         
         state = self.conversation_state[user_id]
         
-        # Add to history (keep last 5 interactions)
+        # Add to history; the deque drops the oldest interaction once full
         state["history"].append({
             "input": user_input,
             "intent": result.intent.value,
@@ -468,20 +654,72 @@ class IntentRecognizer:
             "timestamp": datetime.now().isoformat()
         })
         
-        if len(state["history"]) > 5:
-            state["history"] = state["history"][-5:]
-        
-        # Update last intent and context
+        # Update last intent and context; a follow-up already carries the merged
+        # entities, so anything else starts the history over
         state["last_intent"] = result.intent.value
-        state["context"].update(result.entities)
+        history = self.entity_history[user_id]
+        history.clear()
+        history.update(result.entities)
+    
+    async def _load_conversation_state(self, user_id: str) -> None:
+        """Load conversation state from Redis into the local state."""
+        
+        if not self.redis_client:
+            return
+        
+        try:
+            history, last_intent, context = await self.redis_client.hmget(
+                f"conv:{user_id}", "history", "last_intent", "context"
+            )
+            if history is None:
+                return
+            
+            self.entity_history[user_id] = json.loads(context)
+            self.conversation_state[user_id] = {
+                "history": deque(json.loads(history), maxlen=CONVERSATION_HISTORY_SIZE),
+                "last_intent": json.loads(last_intent),
+                "context": self.entity_history[user_id]
+            }
+        except Exception as e:
+            logger.error(f"Error loading conversation state: {str(e)}")
+    
+    async def _save_conversation_state(self, user_id: str) -> None:
+        """Persist conversation state to Redis so other workers can share it."""
+        
+        if not self.redis_client:
+            return
+        
+        state = self.conversation_state[user_id]
+        try:
+            key = f"conv:{user_id}"
+            # Write and refresh the TTL in one round trip
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                await (
+                    pipe.hset(key, mapping={
+                        "history": json.dumps(list(state["history"]), default=str),
+                        "last_intent": json.dumps(state["last_intent"]),
+                        "context": json.dumps(state["context"], default=str)
+                    })
+                    .expire(key, CONVERSATION_STATE_TTL)
+                    .execute()
+                )
+        except Exception as e:
+            logger.error(f"Error saving conversation state: {str(e)}")
     
     def get_conversation_context(self, user_id: str) -> Dict[str, any]:
         """Get conversation context for a user."""
         
         return self.conversation_state.get(user_id, {})
     
-    def clear_conversation_context(self, user_id: str) -> None:
+    async def clear_conversation_context(self, user_id: str) -> None:
         """Clear conversation context for a user."""
         
         if user_id in self.conversation_state:
-            del self.conversation_state[user_id]
\ No newline at end of file
+            del self.conversation_state[user_id]
+        self.entity_history.pop(user_id, None)
+        
+        if self.redis_client:
+            try:
+                await self.redis_client.delete(f"conv:{user_id}")
+            except Exception as e:
+                logger.error(f"Error clearing conversation state: {str(e)}")
\ No newline at end of file
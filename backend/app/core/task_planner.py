@@ -7,7 +7,8 @@ and error recovery with user confirmation workflows.
 """
 
 import uuid
-from typing import Dict, List, Optional, Any, Callable
+from collections import defaultdict
+from typing import Dict, List, Optional, Any, Callable, Tuple
 from enum import Enum
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
@@ -65,7 +66,7 @@ class Priority(int, Enum):
     CRITICAL = 9
 
 
-@dataclass
+@dataclass(slots=True)
 class Action:
     """Individual action within a task plan."""
     
@@ -85,7 +86,7 @@ class Action:
     completed_at: Optional[datetime] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class TaskPlan:
     """Complete task plan with multiple actions."""
     
@@ -102,27 +103,64 @@ class TaskPlan:
     created_at: datetime = field(default_factory=datetime.now)
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
+    _actions_by_id: Dict[str, Action] = field(default_factory=dict, init=False, repr=False, compare=False)
+    
+    def __post_init__(self) -> None:
+        self._actions_by_id = {action.id: action for action in self.actions}
+    
+    def get_action(self, action_id: str) -> Optional[Action]:
+        """Get an action of this plan by ID."""
+        # Reindex if actions were added or removed after construction
+        if len(self._actions_by_id) != len(self.actions):
+            self._actions_by_id = {action.id: action for action in self.actions}
+        return self._actions_by_id.get(action_id)
+    
+    def dependencies_met(self, action: Action) -> bool:
+        """Check whether all dependencies of an action are completed."""
+        for dep_id in action.dependencies:
+            dep_action = self.get_action(dep_id)
+            if not dep_action or dep_action.status != TaskStatus.COMPLETED:
+                return False
+        return True
     
     def get_next_actions(self) -> List[Action]:
         """Get actions that are ready to execute."""
-        ready_actions = []
+        return [
+            action for action in self.actions
+            if action.status == TaskStatus.PENDING and self.dependencies_met(action)
+        ]
+    
+    def get_dependency_levels(self) -> List[List[Action]]:
+        """
+        Group actions into dependency levels (Kahn's algorithm).
         
-        for action in self.actions:
-            if action.status != TaskStatus.PENDING:
-                continue
-            
-            # Check if all dependencies are completed
-            dependencies_met = True
-            for dep_id in action.dependencies:
-                dep_action = next((a for a in self.actions if a.id == dep_id), None)
-                if not dep_action or dep_action.status != TaskStatus.COMPLETED:
-                    dependencies_met = False
-                    break
-            
-            if dependencies_met:
-                ready_actions.append(action)
+        Actions within a level do not depend on each other, and every
+        dependency of an action sits in an earlier level. Actions on a
+        dependency cycle or depending on an unknown action are left out.
+        """
+        action_ids = {action.id for action in self.actions}
+        in_degree: Dict[str, int] = {}
+        dependents: Dict[str, List[Action]] = defaultdict(list)
         
-        return ready_actions
+        for action in self.actions:
+            dependencies = set(action.dependencies)
+            in_degree[action.id] = len(dependencies)
+            for dep_id in dependencies & action_ids:
+                dependents[dep_id].append(action)
+        
+        levels = []
+        level = [action for action in self.actions if in_degree[action.id] == 0]
+        while level:
+            levels.append(level)
+            next_level = []
+            for action in level:
+                for dependent in dependents[action.id]:
+                    in_degree[dependent.id] -= 1
+                    if in_degree[dependent.id] == 0:
+                        next_level.append(dependent)
+            level = next_level
+        
+        return levels
     
     def update_progress(self) -> None:
         """Update overall progress based on completed actions."""
@@ -130,7 +168,8 @@ class TaskPlan:
             self.progress = 0.0
             return
         
-        completed_count = sum(1 for action in self.actions if action.status == TaskStatus.COMPLETED)
+        # list.count runs the comparison loop in C (identity check first, then ==)
+        completed_count = [action.status for action in self.actions].count(TaskStatus.COMPLETED)
         self.progress = (completed_count / len(self.actions)) * 100.0
         
         # Update overall status
@@ -143,6 +182,16 @@ class TaskPlan:
                 self.started_at = datetime.now()
 
 
+@dataclass(frozen=True)
+class ActionTemplate:
+    """Reusable structure of an action; parameters are filled in per plan."""
+    
+    action_type: ActionType
+    build_parameters: Callable[[Dict[str, Any], str], Dict[str, Any]]
+    dependencies: Tuple[int, ...] = ()  # indices of earlier templates in the plan
+    requires_confirmation: bool = False
+
+
 class TaskPlanner:
     """
     Task planning and execution engine.
@@ -155,6 +204,7 @@ class TaskPlanner:
         self.active_plans: Dict[str, TaskPlan] = {}
         self.action_executors: Dict[ActionType, Callable] = {}
         self.confirmation_callbacks: Dict[str, Callable] = {}
+        self._plan_templates: Dict[str, List[ActionTemplate]] = {}
         
         # Register default action executors
         self._register_default_executors()
@@ -253,43 +303,25 @@ class TaskPlanner:
         logger.info(f"Starting execution of task plan {plan_id}")
         
         try:
-            while plan.status == TaskStatus.IN_PROGRESS:
-                # Get actions ready for execution
-                ready_actions = plan.get_next_actions()
-                
-                if not ready_actions:
-                    # Check if we're waiting for confirmations
-                    waiting_actions = [a for a in plan.actions if a.status == TaskStatus.WAITING_CONFIRMATION]
-                    if waiting_actions:
-                        logger.info(f"Task plan {plan_id} waiting for confirmations")
-                        break
-                    
-                    # Check if all actions are completed
-                    pending_actions = [a for a in plan.actions if a.status == TaskStatus.PENDING]
-                    if not pending_actions:
-                        plan.status = TaskStatus.COMPLETED
-                        plan.completed_at = datetime.now()
-                        break
-                    
-                    # If we have pending actions but none are ready, there might be a dependency issue
-                    logger.warning(f"Task plan {plan_id} has pending actions but none are ready")
+            # Independent actions of each dependency level run concurrently
+            for level in plan.get_dependency_levels():
+                if plan.status != TaskStatus.IN_PROGRESS:
                     break
+                await self._execute_level(level, plan)
+            
+            if plan.status == TaskStatus.IN_PROGRESS:
+                # Check if we're waiting for confirmations
+                if any(a.status == TaskStatus.WAITING_CONFIRMATION for a in plan.actions):
+                    logger.info(f"Task plan {plan_id} waiting for confirmations")
                 
-                # Execute ready actions concurrently (up to a limit)
-                max_concurrent = 3
-                action_batches = [ready_actions[i:i+max_concurrent] 
-                                for i in range(0, len(ready_actions), max_concurrent)]
-                
-                for batch in action_batches:
-                    await asyncio.gather(*[
-                        self._execute_action(action, plan) for action in batch
-                    ], return_exceptions=True)
-                
-                # Update progress
-                plan.update_progress()
+                # Check if all actions are completed
+                elif not any(a.status == TaskStatus.PENDING for a in plan.actions):
+                    plan.status = TaskStatus.COMPLETED
+                    plan.completed_at = datetime.now()
                 
-                # Small delay to prevent tight loops
-                await asyncio.sleep(0.1)
+                # If we have pending actions but none are ready, there might be a dependency issue
+                else:
+                    logger.warning(f"Task plan {plan_id} has pending actions but none are ready")
             
             logger.info(f"Task plan {plan_id} execution completed with status: {plan.status}")
             return plan
@@ -299,11 +331,36 @@ class TaskPlanner:
             plan.status = TaskStatus.FAILED
             raise
     
-    async def _execute_action(self, action: Action, plan: TaskPlan) -> None:
+    async def _execute_level(self, level: List[Action], plan: TaskPlan) -> None:
+        """Execute one dependency level, retrying until none of its actions are ready."""
+        
+        ready_actions = [a for a in level if a.status == TaskStatus.PENDING and plan.dependencies_met(a)]
+        
+        while ready_actions and plan.status == TaskStatus.IN_PROGRESS:
+            # One start timestamp for the whole batch
+            started_at = datetime.now()
+            await asyncio.gather(*[
+                self._execute_action(action, plan, started_at) for action in ready_actions
+            ], return_exceptions=True)
+            
+            # Update progress
+            plan.update_progress()
+            
+            ready_actions = [a for a in level if a.status == TaskStatus.PENDING and plan.dependencies_met(a)]
+            if ready_actions:
+                # Small delay before retrying to prevent tight loops
+                await asyncio.sleep(0.1)
+    
+    async def _execute_action(
+        self,
+        action: Action,
+        plan: TaskPlan,
+        started_at: Optional[datetime] = None
+    ) -> None:
         """Execute a single action with error handling and retries."""
         
         action.status = TaskStatus.IN_PROGRESS
-        action.started_at = datetime.now()
+        action.started_at = started_at or datetime.now()
         
         logger.info(f"Executing action {action.id}: {action.action_type}")
         
@@ -419,184 +476,155 @@ class TaskPlanner:
     ) -> List[Action]:
         """Decompose intent into executable actions."""
         
-        actions = []
-        
-        if intent_type == "calendar_create":
-            actions.extend(await self._create_calendar_actions(entities, context, user_id))
-        elif intent_type == "calendar_query":
-            actions.extend(await self._create_calendar_query_actions(entities, context, user_id))
-        elif intent_type == "calendar_delete":
-            actions.extend(await self._create_calendar_delete_actions(entities, context, user_id))
-        elif intent_type == "task_create":
-            actions.extend(await self._create_task_actions(entities, context, user_id))
-        elif intent_type == "message_send":
-            actions.extend(await self._create_message_actions(entities, context, user_id))
-        else:
-            # Default action for unknown intents
+        # The action graph only depends on the intent, so it is built once per
+        # intent and filled in with this call's entities
+        templates = self._plan_templates.get(intent_type)
+        if templates is None:
+            templates = self._build_plan_template(intent_type)
+            self._plan_templates[intent_type] = templates
+        
+        actions: List[Action] = []
+        for template in templates:
             actions.append(Action(
                 id=str(uuid.uuid4()),
-                action_type=ActionType.SYSTEM_NOTIFY,
-                parameters={"message": "I'm not sure how to help with that. Could you be more specific?"}
+                action_type=template.action_type,
+                parameters=template.build_parameters(entities, user_id),
+                dependencies=[actions[index].id for index in template.dependencies],
+                requires_confirmation=template.requires_confirmation
             ))
         
         return actions
     
-    async def _create_calendar_actions(
-        self,
-        entities: Dict[str, Any],
-        context: Dict[str, Any],
-        user_id: str
-    ) -> List[Action]:
-        """Create actions for calendar event creation."""
-        
-        actions = []
-        
-        # Extract event details from entities
-        title = entities.get("title", "New Event")
-        time_info = entities.get("time", [])
-        date_info = entities.get("date", [])
-        people = entities.get("people", [])
-        location = entities.get("location", [])
-        
-        # Create calendar event action
-        create_action = Action(
-            id=str(uuid.uuid4()),
-            action_type=ActionType.CALENDAR_CREATE_EVENT,
-            parameters={
-                "title": title,
-                "time": time_info,
-                "date": date_info,
-                "attendees": people,
-                "location": location[0] if location else None,
-                "user_id": user_id
-            },
-            requires_confirmation=True
-        )
-        actions.append(create_action)
-        
-        # Add confirmation notification
-        notify_action = Action(
-            id=str(uuid.uuid4()),
-            action_type=ActionType.SYSTEM_NOTIFY,
-            parameters={
-                "message": f"Calendar event '{title}' has been created successfully."
-            },
-            dependencies=[create_action.id]
-        )
-        actions.append(notify_action)
-        
-        return actions
-    
-    async def _create_calendar_query_actions(
-        self,
-        entities: Dict[str, Any],
-        context: Dict[str, Any],
-        user_id: str
-    ) -> List[Action]:
-        """Create actions for calendar queries."""
-        
-        actions = []
-        
-        # Query calendar events
-        query_action = Action(
-            id=str(uuid.uuid4()),
-            action_type=ActionType.CALENDAR_QUERY_EVENTS,
-            parameters={
-                "user_id": user_id,
-                "date_range": entities.get("date", ["today"]),
-                "filters": entities
-            }
-        )
-        actions.append(query_action)
-        
-        return actions
-    
-    async def _create_calendar_delete_actions(
-        self,
-        entities: Dict[str, Any],
-        context: Dict[str, Any],
-        user_id: str
-    ) -> List[Action]:
-        """Create actions for calendar event deletion."""
+    def _build_plan_template(self, intent_type: str) -> List[ActionTemplate]:
+        """Build the action templates for an intent."""
         
-        actions = []
-        
-        # First query to find the event to delete
-        query_action = Action(
-            id=str(uuid.uuid4()),
-            action_type=ActionType.CALENDAR_QUERY_EVENTS,
-            parameters={
-                "user_id": user_id,
-                "filters": entities
-            }
-        )
-        actions.append(query_action)
-        
-        # Delete the found event
-        delete_action = Action(
-            id=str(uuid.uuid4()),
-            action_type=ActionType.CALENDAR_DELETE_EVENT,
-            parameters={
-                "user_id": user_id,
-                "event_criteria": entities
-            },
-            dependencies=[query_action.id],
-            requires_confirmation=True
-        )
-        actions.append(delete_action)
+        builders = {
+            "calendar_create": self._calendar_create_template,
+            "calendar_query": self._calendar_query_template,
+            "calendar_delete": self._calendar_delete_template,
+            "task_create": self._task_create_template,
+            "message_send": self._message_send_template,
+        }
         
-        return actions
-    
-    async def _create_task_actions(
-        self,
-        entities: Dict[str, Any],
-        context: Dict[str, Any],
-        user_id: str
-    ) -> List[Action]:
-        """Create actions for task management."""
-        
-        actions = []
-        
-        # Create task action
-        create_action = Action(
-            id=str(uuid.uuid4()),
-            action_type=ActionType.TASK_CREATE,
-            parameters={
-                "title": entities.get("title", "New Task"),
-                "description": entities.get("description", ""),
-                "due_date": entities.get("date"),
-                "priority": Priority.MEDIUM.value,
+        builder = builders.get(intent_type)
+        if builder is None:
+            # Default action for unknown intents
+            return [ActionTemplate(
+                action_type=ActionType.SYSTEM_NOTIFY,
+                build_parameters=lambda entities, user_id: {
+                    "message": "I'm not sure how to help with that. Could you be more specific?"
+                }
+            )]
+        
+        return builder()
+    
+    @staticmethod
+    def _calendar_create_template() -> List[ActionTemplate]:
+        """Templates for calendar event creation."""
+        
+        def create_parameters(entities: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+            location = entities.get("location", [])
+            return {
+                "title": entities.get("title", "New Event"),
+                "time": entities.get("time", []),
+                "date": entities.get("date", []),
+                "attendees": entities.get("people", []),
+                "location": location[0] if location else None,
                 "user_id": user_id
             }
-        )
-        actions.append(create_action)
-        
-        return actions
-    
-    async def _create_message_actions(
-        self,
-        entities: Dict[str, Any],
-        context: Dict[str, Any],
-        user_id: str
-    ) -> List[Action]:
-        """Create actions for messaging."""
-        
-        actions = []
         
-        # Send WhatsApp message action
-        message_action = Action(
-            id=str(uuid.uuid4()),
-            action_type=ActionType.MESSAGE_SEND_WHATSAPP,
-            parameters={
-                "recipient": entities.get("people", [""])[0] if entities.get("people") else "",
-                "message": entities.get("message", ""),
-                "user_id": user_id
-            },
-            requires_confirmation=True
-        )
-        actions.append(message_action)
-        
-        return actions
+        return [
+            # Create calendar event action
+            ActionTemplate(
+                action_type=ActionType.CALENDAR_CREATE_EVENT,
+                build_parameters=create_parameters,
+                requires_confirmation=True
+            ),
+            # Add confirmation notification
+            ActionTemplate(
+                action_type=ActionType.SYSTEM_NOTIFY,
+                build_parameters=lambda entities, user_id: {
+                    "message": f"Calendar event '{entities.get('title', 'New Event')}' has been created successfully."
+                },
+                dependencies=(0,)
+            ),
+        ]
+    
+    @staticmethod
+    def _calendar_query_template() -> List[ActionTemplate]:
+        """Templates for calendar queries."""
+        
+        return [
+            # Query calendar events
+            ActionTemplate(
+                action_type=ActionType.CALENDAR_QUERY_EVENTS,
+                build_parameters=lambda entities, user_id: {
+                    "user_id": user_id,
+                    "date_range": entities.get("date", ["today"]),
+                    "filters": entities
+                }
+            ),
+        ]
+    
+    @staticmethod
+    def _calendar_delete_template() -> List[ActionTemplate]:
+        """Templates for calendar event deletion."""
+        
+        return [
+            # First query to find the event to delete
+            ActionTemplate(
+                action_type=ActionType.CALENDAR_QUERY_EVENTS,
+                build_parameters=lambda entities, user_id: {
+                    "user_id": user_id,
+                    "filters": entities
+                }
+            ),
+            # Delete the found event
+            ActionTemplate(
+                action_type=ActionType.CALENDAR_DELETE_EVENT,
+                build_parameters=lambda entities, user_id: {
+                    "user_id": user_id,
+                    "event_criteria": entities
+                },
+                dependencies=(0,),
+                requires_confirmation=True
+            ),
+        ]
+    
+    @staticmethod
+    def _task_create_template() -> List[ActionTemplate]:
+        """Templates for task management."""
+        
+        return [
+            # Create task action
+            ActionTemplate(
+                action_type=ActionType.TASK_CREATE,
+                build_parameters=lambda entities, user_id: {
+                    "title": entities.get("title", "New Task"),
+                    "description": entities.get("description", ""),
+                    "due_date": entities.get("date"),
+                    "priority": Priority.MEDIUM.value,
+                    "user_id": user_id
+                }
+            ),
+        ]
+    
+    @staticmethod
+    def _message_send_template() -> List[ActionTemplate]:
+        """Templates for messaging."""
+        
+        return [
+            # Send WhatsApp message action
+            ActionTemplate(
+                action_type=ActionType.MESSAGE_SEND_WHATSAPP,
+                build_parameters=lambda entities, user_id: {
+                    "recipient": entities.get("people", [""])[0] if entities.get("people") else "",
+                    "message": entities.get("message", ""),
+                    "user_id": user_id
+                },
+                requires_confirmation=True
+            ),
+        ]
     
     def _estimate_action_duration(self, action: Action) -> int:
         """Estimate action duration in minutes."""
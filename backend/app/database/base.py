@@ -1,7 +1,12 @@
 """
 Database base configuration and session management.
 """
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -24,6 +29,63 @@ engine = create_engine(
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engines are bound to the event loop they first run on, so keep one per
+# loop. Celery workers run every task on one persistent loop per process
+# (see celery_app.run_async), so each worker process shares a single pool.
+_async_engines: Dict[asyncio.AbstractEventLoop, AsyncEngine] = {}
+
+
+def _async_database_url(url: str) -> str:
+    """Swap the synchronous PostgreSQL driver for asyncpg."""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Get the pooled async engine for the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    engine = _async_engines.get(loop)
+    if engine is None:
+        # Forget engines whose loops are gone
+        for stale_loop in [l for l in _async_engines if l.is_closed()]:
+            del _async_engines[stale_loop]
+        
+        engine = create_async_engine(
+            _async_database_url(DATABASE_URL),
+            pool_pre_ping=True,
+            pool_size=20,  # Shared by all tasks running on this loop
+            max_overflow=30,
+            pool_recycle=300  # Recycle idle connections after 5 minutes
+        )
+        _async_engines[loop] = engine
+    return engine
+
+
+async def dispose_async_engine() -> None:
+    """
+    Close the pooled connections of the running loop's async engine.
+    """
+    engine = _async_engines.pop(asyncio.get_running_loop(), None)
+    if engine is not None:
+        await engine.dispose()
+
+
+@asynccontextmanager
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """
+    Get an async database session from the running loop's pooled engine.
+    """
+    session = AsyncSession(get_async_engine(), expire_on_commit=False)
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
 # Create Base class for models
 Base = declarative_base()
 
@@ -719,4 +719,8 @@ class GoogleCalendarService:
 
 
 # Create service instance
-calendar_service = GoogleCalendarService()
\ No newline at end of file
+calendar_service = GoogleCalendarService()
+
+def get_calendar_service() -> GoogleCalendarService:
+    """Provide the shared calendar service to API routes (overridable in tests)."""
+    return calendar_service
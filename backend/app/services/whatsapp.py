@@ -26,6 +26,26 @@ from ..schemas.whatsapp import (
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of messages dispatched concurrently by send_messages_batch;
+# also caps the connections held open by the shared HTTP client.
+WHATSAPP_BATCH_SIZE = 50
+
+
+def create_batch_client() -> httpx.AsyncClient:
+    """
+    Create an HTTP client for batched sends.
+    
+    The pool holds WHATSAPP_BATCH_SIZE connections; requests beyond that wait
+    for a free connection instead of failing on the pool timeout.
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=WHATSAPP_BATCH_SIZE,
+            max_keepalive_connections=WHATSAPP_BATCH_SIZE
+        ),
+        timeout=httpx.Timeout(5.0, pool=None)
+    )
+
 
 class WhatsAppBusinessAPI:
     """WhatsApp Business Cloud API client."""
@@ -36,8 +56,18 @@ class WhatsAppBusinessAPI:
         self.phone_number_id = settings.WHATSAPP_PHONE_NUMBER_ID
         self.verify_token = settings.WHATSAPP_VERIFY_TOKEN
         
-    async def send_message(self, recipient: str, message: Dict[str, Any]) -> Dict[str, Any]:
-        """Send a message via WhatsApp Business API."""
+    async def send_message(
+        self,
+        recipient: str,
+        message: Dict[str, Any],
+        client: Optional[httpx.AsyncClient] = None
+    ) -> Dict[str, Any]:
+        """
+        Send a message via WhatsApp Business API.
+        
+        Pass a shared ``client`` to reuse its keep-alive connections across
+        many sends; otherwise a short-lived client is opened for this call.
+        """
         if not self.access_token or not self.phone_number_id:
             raise ValueError("WhatsApp API credentials not configured")
         
@@ -53,29 +83,46 @@ class WhatsAppBusinessAPI:
             **message
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(url, headers=headers, json=payload)
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPError as e:
-                logger.error(f"WhatsApp API error: {e}")
-                raise
+        if client is None:
+            async with httpx.AsyncClient() as client:
+                return await self._post(client, url, headers, payload)
+        return await self._post(client, url, headers, payload)
+    
+    async def _post(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        headers: Dict[str, str],
+        payload: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        try:
+            response = await client.post(url, headers=headers, json=payload)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            logger.error(f"WhatsApp API error: {e}")
+            raise
     
-    async def send_text_message(self, recipient: str, text: str) -> Dict[str, Any]:
+    async def send_text_message(
+        self,
+        recipient: str,
+        text: str,
+        client: Optional[httpx.AsyncClient] = None
+    ) -> Dict[str, Any]:
         """Send a text message."""
         message = {
             "type": "text",
             "text": {"body": text}
         }
-        return await self.send_message(recipient, message)
+        return await self.send_message(recipient, message, client=client)
     
     async def send_template_message(
         self, 
         recipient: str, 
         template_name: str, 
         language: str = "en_US",
-        parameters: Optional[List[Dict[str, Any]]] = None
+        parameters: Optional[List[Dict[str, Any]]] = None,
+        client: Optional[httpx.AsyncClient] = None
     ) -> Dict[str, Any]:
         """Send a template message."""
         components = []
@@ -93,7 +140,7 @@ class WhatsAppBusinessAPI:
                 "components": components
             }
         }
-        return await self.send_message(recipient, message)
+        return await self.send_message(recipient, message, client=client)
     
     async def send_interactive_message(
         self, 
@@ -194,13 +241,43 @@ class WhatsAppService:
         self.api = WhatsAppBusinessAPI()
         self.template_manager = MessageTemplateManager()
     
+    async def get_user_context(
+        self,
+        db: AsyncSession,
+        user_id: str
+    ) -> Tuple[Optional[str], bool]:
+        """
+        Get ``(phone_number, opted_in)`` for a user.
+        
+        The phone number is taken from the user's most recent active thread.
+        Both are read fresh on every call so a revoked opt-in takes effect
+        immediately in every process.
+        """
+        key = str(user_id)
+        opted_in = await self.check_user_opt_in(db, key)
+        result = await db.execute(
+            select(WhatsAppThread.phone_number).where(
+                and_(
+                    WhatsAppThread.user_id == key,
+                    WhatsAppThread.thread_status == ThreadStatus.ACTIVE
+                )
+            ).order_by(desc(WhatsAppThread.last_message_at)).limit(1)
+        )
+        return result.scalar_one_or_none(), opted_in
+    
     async def get_or_create_thread(
         self, 
         db: AsyncSession, 
         user_id: str, 
-        phone_number: str
+        phone_number: str,
+        commit: bool = True
     ) -> WhatsAppThread:
-        """Get existing thread or create new one."""
+        """
+        Get existing thread or create new one.
+        
+        With ``commit=False`` a new thread is only flushed, leaving the commit
+        to the caller's transaction.
+        """
         # Clean phone number
         cleaned_phone = ''.join(c for c in phone_number if c.isdigit() or c == '+')
         
@@ -223,8 +300,11 @@ class WhatsAppService:
                 thread_status=ThreadStatus.ACTIVE
             )
             db.add(thread)
-            await db.commit()
-            await db.refresh(thread)
+            if commit:
+                await db.commit()
+                await db.refresh(thread)
+            else:
+                await db.flush()
         
         return thread
     
@@ -240,54 +320,154 @@ class WhatsAppService:
         
         try:
             # Send via WhatsApp API
-            if message_data.message_type == MessageType.TEMPLATE:
-                api_response = await self.api.send_template_message(
-                    message_data.recipient,
-                    message_data.template_name,
-                    parameters=message_data.template_params.get("parameters", [])
-                )
-            else:
-                api_response = await self.api.send_text_message(
-                    message_data.recipient,
-                    message_data.content
-                )
-            
-            # Store message in database
-            whatsapp_message_id = api_response.get("messages", [{}])[0].get("id")
-            
-            message = WhatsAppMessage(
-                thread_id=thread.id,
-                message_id=whatsapp_message_id,
-                direction=MessageDirection.OUTBOUND,
-                content=message_data.content,
-                message_type=message_data.message_type,
-                status=MessageStatus.SENT
-            )
-            
-            db.add(message)
+            api_response = await self._dispatch(message_data)
             
-            # Update thread last message time
-            thread.last_message_at = datetime.utcnow()
+            message = self._record_outbound(db, thread, message_data, api_response)
             
             await db.commit()
             await db.refresh(message)
             
-            return WhatsAppMessageResponse(
-                id=str(message.id),
-                thread_id=str(thread.id),
-                message_id=whatsapp_message_id,
-                direction=message.direction,
-                content=message.content,
-                message_type=message.message_type,
-                status=message.status,
-                sent_at=message.sent_at
-            )
+            return self._to_response(message, thread)
             
         except Exception as e:
             logger.error(f"Failed to send WhatsApp message: {e}")
             await db.rollback()
             raise
     
+    async def send_messages_batch(
+        self,
+        db: AsyncSession,
+        messages: List[Tuple[str, WhatsAppMessageCreate]],
+        client: Optional[httpx.AsyncClient] = None
+    ) -> List[Optional[str]]:
+        """
+        Send many WhatsApp messages concurrently and record them in one commit.
+        
+        Threads are resolved before anything is sent, so a database error there
+        aborts the batch with nothing delivered. Once sent, each message is
+        stored in its own SAVEPOINT: a row that fails to store is logged and
+        skipped without dropping the rest of the batch. Pass a shared ``client``
+        (see ``create_batch_client``) to reuse one connection pool across
+        batches. Returns the WhatsApp message ID per input message, ``None``
+        where sending failed.
+        """
+        if not messages:
+            return []
+        
+        threads: Dict[Tuple[str, str], WhatsAppThread] = {}
+        for user_id, message_data in messages:
+            key = (str(user_id), message_data.recipient)
+            if key not in threads:
+                threads[key] = await self.get_or_create_thread(
+                    db, user_id, message_data.recipient, commit=False
+                )
+        
+        if client is None:
+            async with create_batch_client() as client:
+                api_responses = await self._dispatch_all(messages, client)
+        else:
+            api_responses = await self._dispatch_all(messages, client)
+        
+        # The session cannot run queries concurrently, so persist sequentially
+        sent = []
+        for (user_id, message_data), api_response in zip(messages, api_responses):
+            if isinstance(api_response, Exception):
+                logger.error(f"Failed to send WhatsApp message to user {user_id}: {api_response}")
+                sent.append(None)
+                continue
+            
+            message_id = api_response.get("messages", [{}])[0].get("id")
+            try:
+                async with db.begin_nested():
+                    self._record_outbound(
+                        db, threads[(str(user_id), message_data.recipient)],
+                        message_data, api_response
+                    )
+            except Exception as e:
+                logger.error(
+                    f"WhatsApp message {message_id} to user {user_id} was sent but not stored: {e}"
+                )
+            sent.append(message_id)
+        
+        try:
+            await db.commit()
+        except Exception as e:
+            delivered = [message_id for message_id in sent if message_id is not None]
+            logger.error(f"WhatsApp messages {delivered} were sent but not stored: {e}")
+            await db.rollback()
+        
+        return sent
+    
+    async def _dispatch_all(
+        self,
+        messages: List[Tuple[str, WhatsAppMessageCreate]],
+        client: httpx.AsyncClient
+    ) -> List[Any]:
+        """Send all messages concurrently; failures are returned, not raised."""
+        return await asyncio.gather(
+            *(self._dispatch(message_data, client) for _, message_data in messages),
+            return_exceptions=True
+        )
+    
+    async def _dispatch(
+        self,
+        message_data: WhatsAppMessageCreate,
+        client: Optional[httpx.AsyncClient] = None
+    ) -> Dict[str, Any]:
+        """Send a message through the API according to its type."""
+        if message_data.message_type == MessageType.TEMPLATE:
+            return await self.api.send_template_message(
+                message_data.recipient,
+                message_data.template_name,
+                parameters=message_data.template_params.get("parameters", []),
+                client=client
+            )
+        return await self.api.send_text_message(
+            message_data.recipient,
+            message_data.content,
+            client=client
+        )
+    
+    def _record_outbound(
+        self,
+        db: AsyncSession,
+        thread: WhatsAppThread,
+        message_data: WhatsAppMessageCreate,
+        api_response: Dict[str, Any]
+    ) -> WhatsAppMessage:
+        """Stage an outbound message row and bump the thread timestamp."""
+        whatsapp_message_id = api_response.get("messages", [{}])[0].get("id")
+        
+        message = WhatsAppMessage(
+            thread_id=thread.id,
+            message_id=whatsapp_message_id,
+            direction=MessageDirection.OUTBOUND,
+            content=message_data.content,
+            message_type=message_data.message_type,
+            status=MessageStatus.SENT
+        )
+        db.add(message)
+        
+        # Update thread last message time
+        thread.last_message_at = datetime.utcnow()
+        return message
+    
+    @staticmethod
+    def _to_response(
+        message: WhatsAppMessage,
+        thread: WhatsAppThread
+    ) -> WhatsAppMessageResponse:
+        return WhatsAppMessageResponse(
+            id=str(message.id),
+            thread_id=str(thread.id),
+            message_id=message.message_id,
+            direction=message.direction,
+            content=message.content,
+            message_type=message.message_type,
+            status=message.status,
+            sent_at=message.sent_at
+        )
+    
     async def process_incoming_message(
         self,
         db: AsyncSession,
@@ -519,8 +699,14 @@ class WhatsAppService:
         summary: DailySummary
     ) -> Optional[WhatsAppMessageResponse]:
         """Send daily summary to user."""
+        phone_number, opted_in = await self.get_user_context(db, user_id)
+        
         # Check if user opted in
-        if not await self.check_user_opt_in(db, user_id):
+        if not opted_in:
+            return None
+        
+        if not phone_number:
+            logger.warning(f"No active WhatsApp thread for user {user_id}")
             return None
         
         # Format summary message
@@ -532,24 +718,9 @@ class WhatsAppService:
             summary.next_day_preview
         )
         
-        # Get user's thread
-        result = await db.execute(
-            select(WhatsAppThread).where(
-                and_(
-                    WhatsAppThread.user_id == user_id,
-                    WhatsAppThread.thread_status == ThreadStatus.ACTIVE
-                )
-            ).order_by(desc(WhatsAppThread.last_message_at))
-        )
-        thread = result.scalar_one_or_none()
-        
-        if not thread:
-            logger.warning(f"No active WhatsApp thread for user {user_id}")
-            return None
-        
         # Send summary
         message_data = WhatsAppMessageCreate(
-            recipient=thread.phone_number,
+            recipient=phone_number,
             content=summary_text,
             message_type=MessageType.TEXT
         )
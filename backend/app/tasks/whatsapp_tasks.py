@@ -1,15 +1,15 @@
 """
 Celery tasks for WhatsApp messaging and workflow automation.
 """
+import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
-from celery import Celery
+from typing import List, Dict, Any, Optional, Tuple
+from celery import Celery, group
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, desc
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, and_, func, desc, exists, literal, null, union_all
 
-from ..celery_app import celery_app
+from ..celery_app import celery_app, run_async
 from ..database.base import get_async_session
 from ..database.models import (
     User, UserSettings, WhatsAppThread, WhatsAppMessage,
@@ -19,50 +19,117 @@ from ..schemas.whatsapp import (
     DailySummary, ConfirmationMessage, WhatsAppMessageCreate,
     MessageType
 )
-from ..services.whatsapp import whatsapp_service
+from ..services.whatsapp import whatsapp_service, create_batch_client, WHATSAPP_BATCH_SIZE
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on per-user sends in flight at once. Each send holds its own
+# session, so keep this below the database pool size (pool_size + max_overflow).
+MAX_CONCURRENT_SENDS = 10
+
+# Users handled by each send_daily_summary_batch subtask.
+SUMMARY_BATCH_SIZE = 100
+
+# Rows fetched per round-trip when streaming due reminders.
+REMINDER_FETCH_SIZE = 500
+
+
+async def _gather_with_limit(func, items, limit: int = MAX_CONCURRENT_SENDS):
+    """Run ``func`` over ``items`` concurrently, at most ``limit`` at a time."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _guarded(item):
+        async with semaphore:
+            return await func(item)
+
+    return await asyncio.gather(
+        *(_guarded(item) for item in items), return_exceptions=True
+    )
+
+
+def _format_clock_time(value: datetime) -> str:
+    """Format a time like ``strftime("%I:%M %p")`` without the per-call strftime cost."""
+    hour = value.hour
+    return f"{(hour % 12) or 12:02d}:{value.minute:02d} {'PM' if hour >= 12 else 'AM'}"
+
+
+def _latest_active_thread():
+    """
+    Subquery ranking each user's active threads by recency.
+
+    Join on ``rn == 1`` to pick the most recently used thread per user.
+    """
+    return (
+        select(
+            WhatsAppThread.user_id,
+            WhatsAppThread.phone_number,
+            func.row_number().over(
+                partition_by=WhatsAppThread.user_id,
+                order_by=desc(WhatsAppThread.last_message_at)
+            ).label("rn")
+        )
+        .where(WhatsAppThread.status == "active")
+        .subquery()
+    )
+
 
 @celery_app.task(name="send_daily_summaries")
 def send_daily_summaries_task():
     """
     Celery task to send daily summaries to all opted-in users.
     
-    Runs daily at a scheduled time (typically evening).
+    Runs daily at a scheduled time (typically evening). Only collects the
+    opted-in user IDs and fans them out to send_daily_summary_batch
+    subtasks, so summaries are spread across all available workers.
     """
-    import asyncio
+    async def _collect_user_ids():
+        async with get_async_session() as db:
+            # Get all users with WhatsApp opt-in
+            result = await db.execute(
+                select(User.id)
+                .join(UserSettings)
+                .where(UserSettings.whatsapp_opt_in == True)
+            )
+            return [str(user_id) for user_id in result.scalars()]
+    
+    try:
+        user_ids = run_async(_collect_user_ids())
+    except Exception as e:
+        logger.error(f"Error in daily summaries task: {e}")
+        return
+    
+    logger.info(f"Dispatching daily summaries for {len(user_ids)} users")
+    if not user_ids:
+        return
     
+    group(
+        send_daily_summary_batch.s(user_ids[i:i + SUMMARY_BATCH_SIZE])
+        for i in range(0, len(user_ids), SUMMARY_BATCH_SIZE)
+    ).apply_async()
+
+
+@celery_app.task(name="send_daily_summary_batch")
+def send_daily_summary_batch(user_ids: List[str]):
+    """
+    Celery task to send daily summaries to one chunk of users.
+    """
     async def _send_summaries():
-        async with get_async_session() as db:
-            try:
-                # Get all users with WhatsApp opt-in
-                result = await db.execute(
-                    select(User)
-                    .join(UserSettings)
-                    .where(UserSettings.whatsapp_opt_in == True)
-                    .options(selectinload(User.settings))
-                )
-                users = result.scalars().all()
-                
-                logger.info(f"Sending daily summaries to {len(users)} users")
-                
-                for user in users:
-                    try:
-                        summary = await generate_daily_summary(db, str(user.id))
-                        if summary:
-                            await whatsapp_service.send_daily_summary(
-                                db, str(user.id), summary
-                            )
-                            logger.info(f"Daily summary sent to user {user.id}")
-                    except Exception as e:
-                        logger.error(f"Failed to send summary to user {user.id}: {e}")
-                
-            except Exception as e:
-                logger.error(f"Error in daily summaries task: {e}")
+        async def _send_one(user_id: str):
+            # Sessions cannot run concurrent queries, so each user gets its own
+            async with get_async_session() as user_db:
+                try:
+                    summary = await generate_daily_summary(user_db, user_id)
+                    if summary:
+                        await whatsapp_service.send_daily_summary(
+                            user_db, user_id, summary
+                        )
+                        logger.info(f"Daily summary sent to user {user_id}")
+                except Exception as e:
+                    logger.error(f"Failed to send summary to user {user_id}: {e}")
+        
+        await _gather_with_limit(_send_one, user_ids)
     
-    # Run the async function
-    asyncio.run(_send_summaries())
+    run_async(_send_summaries())
 
 
 @celery_app.task(name="process_confirmation_timeout")
@@ -72,8 +139,6 @@ def process_confirmation_timeout_task(confirmation_id: str, user_id: str):
     
     Automatically cancels actions that haven't been confirmed within the timeout period.
     """
-    import asyncio
-    
     async def _process_timeout():
         async with get_async_session() as db:
             try:
@@ -98,19 +163,11 @@ def process_confirmation_timeout_task(confirmation_id: str, user_id: str):
                     message_type=MessageType.TEXT
                 )
                 
-                # Get user's thread and send notification
-                result = await db.execute(
-                    select(WhatsAppThread).where(
-                        and_(
-                            WhatsAppThread.user_id == user_id,
-                            WhatsAppThread.thread_status == "active"
-                        )
-                    ).order_by(desc(WhatsAppThread.last_message_at))
-                )
-                thread = result.scalar_one_or_none()
+                # Get user's latest active thread and send notification
+                phone_number, _ = await whatsapp_service.get_user_context(db, user_id)
                 
-                if thread:
-                    message.recipient = thread.phone_number
+                if phone_number:
+                    message.recipient = phone_number
                     await whatsapp_service.send_message(db, user_id, message)
                 
                 logger.info(f"Processed confirmation timeout for user {user_id}")
@@ -118,7 +175,7 @@ def process_confirmation_timeout_task(confirmation_id: str, user_id: str):
             except Exception as e:
                 logger.error(f"Error processing confirmation timeout: {e}")
     
-    asyncio.run(_process_timeout())
+    run_async(_process_timeout())
 
 
 @celery_app.task(name="send_task_reminders")
@@ -128,67 +185,149 @@ def send_task_reminders_task():
     
     Runs periodically to check for upcoming task deadlines.
     """
-    import asyncio
-    
-    async def _send_reminders():
+    async def _stream_reminders(client):
+        async def _send_batch(batch):
+            pending = []
+            for task_id, user_id, title, due_date, phone_number in batch:
+                reminder_text = (
+                    f"⏰ Task Reminder: {title}\n\n"
+                    f"Due: {_format_clock_time(due_date)}\n\n"
+                    f"Reply DONE when completed."
+                )
+                pending.append((user_id, WhatsAppMessageCreate(
+                    recipient=phone_number,
+                    content=reminder_text,
+                    message_type=MessageType.TEXT
+                )))
+            
+            async with get_async_session() as batch_db:
+                try:
+                    sent = await whatsapp_service.send_messages_batch(
+                        batch_db, pending, client=client
+                    )
+                    for (task_id, *_), message_id in zip(batch, sent):
+                        if message_id is not None:
+                            logger.info(f"Reminder sent for task {task_id}")
+                except Exception as e:
+                    logger.error(f"Failed to send reminder batch: {e}")
+        
+        # Batches are sent while rows are still streaming in; the semaphore
+        # caps batches in flight, which also bounds how far the stream runs ahead
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+        in_flight = set()
+        
+        async def _send_batch_and_release(batch):
+            try:
+                await _send_batch(batch)
+            finally:
+                semaphore.release()
+        
+        async def _dispatch(batch):
+            await semaphore.acquire()
+            task = asyncio.create_task(_send_batch_and_release(batch))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        
         async with get_async_session() as db:
             try:
-                # Get tasks due within next 2 hours for opted-in users
-                reminder_time = datetime.utcnow() + timedelta(hours=2)
+                # Get tasks due within next 2 hours for opted-in users,
+                # together with each user's latest active thread
+                now = datetime.utcnow()
+                reminder_time = now + timedelta(hours=2)
                 
-                result = await db.execute(
-                    select(Task)
+                # Most runs have nothing due; one EXISTS probe is cheaper
+                # than ranking every user's threads
+                has_due_tasks = await db.scalar(
+                    select(
+                        exists().where(
+                            and_(
+                                Task.due_date <= reminder_time,
+                                Task.due_date > now,
+                                Task.status == "pending"
+                            )
+                        )
+                    )
+                )
+                if not has_due_tasks:
+                    logger.info("No tasks due for reminders")
+                    return
+                
+                latest_thread = _latest_active_thread()
+                
+                # Stream through a server-side cursor so memory stays bounded
+                result = await db.stream(
+                    select(
+                        Task.id,
+                        Task.user_id,
+                        Task.title,
+                        Task.due_date,
+                        latest_thread.c.phone_number
+                    )
+                    .select_from(Task)
                     .join(User)
                     .join(UserSettings)
+                    .join(
+                        latest_thread,
+                        and_(
+                            latest_thread.c.user_id == Task.user_id,
+                            latest_thread.c.rn == 1
+                        )
+                    )
                     .where(
                         and_(
                             Task.due_date <= reminder_time,
-                            Task.due_date > datetime.utcnow(),
+                            Task.due_date > now,
                             Task.status == "pending",
                             UserSettings.whatsapp_opt_in == True
                         )
                     )
-                    .options(selectinload(Task.user))
+                    .execution_options(yield_per=REMINDER_FETCH_SIZE)
                 )
-                tasks = result.scalars().all()
                 
-                logger.info(f"Sending reminders for {len(tasks)} tasks")
-                
-                for task in tasks:
-                    try:
-                        reminder_text = f"⏰ Task Reminder: {task.title}\n\nDue: {task.due_date.strftime('%I:%M %p')}\n\nReply DONE when completed."
-                        
-                        message = WhatsAppMessageCreate(
-                            recipient="",  # Will be filled by service
-                            content=reminder_text,
-                            message_type=MessageType.TEXT
-                        )
-                        
-                        # Get user's thread
-                        thread_result = await db.execute(
-                            select(WhatsAppThread).where(
-                                and_(
-                                    WhatsAppThread.user_id == task.user_id,
-                                    WhatsAppThread.thread_status == "active"
-                                )
-                            ).order_by(desc(WhatsAppThread.last_message_at))
-                        )
-                        thread = thread_result.scalar_one_or_none()
-                        
-                        if thread:
-                            message.recipient = thread.phone_number
-                            await whatsapp_service.send_message(
-                                db, str(task.user_id), message
-                            )
-                            logger.info(f"Reminder sent for task {task.id}")
-                        
-                    except Exception as e:
-                        logger.error(f"Failed to send reminder for task {task.id}: {e}")
+                total = 0
+                batch = []
+                async for task_id, user_id, title, due_date, phone_number in result:
+                    batch.append((task_id, str(user_id), title, due_date, phone_number))
+                    if len(batch) == WHATSAPP_BATCH_SIZE:
+                        total += len(batch)
+                        await _dispatch(batch)
+                        batch = []
+                if batch:
+                    total += len(batch)
+                    await _dispatch(batch)
                 
+                logger.info(f"Sending reminders for {total} tasks")
             except Exception as e:
                 logger.error(f"Error in task reminders: {e}")
+            finally:
+                if in_flight:
+                    await asyncio.gather(*in_flight, return_exceptions=True)
+    
+    async def _send_reminders():
+        # One connection pool shared by every batch of this run
+        async with create_batch_client() as client:
+            await _stream_reminders(client)
     
-    asyncio.run(_send_reminders())
+    run_async(_send_reminders())
+
+
+def schedule_confirmation_timeouts(timeouts: List[Tuple[str, str, int]]) -> None:
+    """
+    Schedule confirmation timeout tasks for (confirmation_id, user_id, countdown) entries.
+    
+    All entries are published through one producer acquired from the app's
+    pool, so a burst of confirmations shares a single broker connection.
+    """
+    if not timeouts:
+        return
+    
+    with celery_app.producer_or_acquire() as producer:
+        for confirmation_id, user_id, countdown in timeouts:
+            process_confirmation_timeout_task.apply_async(
+                args=[confirmation_id, user_id],
+                countdown=countdown,
+                producer=producer
+            )
 
 
 async def generate_daily_summary(db: AsyncSession, user_id: str) -> Optional[DailySummary]:
@@ -197,55 +336,80 @@ async def generate_daily_summary(db: AsyncSession, user_id: str) -> Optional[Dai
     """
     try:
         today = datetime.utcnow().date()
-        tomorrow = today + timedelta(days=1)
         
-        # Get today's completed tasks
-        tasks_result = await db.execute(
-            select(Task).where(
-                and_(
-                    Task.user_id == user_id,
-                    func.date(Task.created_at) == today,
-                    Task.status == "completed"
-                )
+        # Half-open day ranges keep the predicates index-friendly
+        today_start = datetime.combine(today, datetime.min.time())
+        tomorrow_start = today_start + timedelta(days=1)
+        day_after_start = tomorrow_start + timedelta(days=1)
+        
+        # Count today's completed tasks and events in SQL and fetch only the
+        # tomorrow events shown in the preview, all in one round-trip
+        completed_tasks_q = select(
+            literal("completed_tasks").label("kind"),
+            func.count().label("total"),
+            null().label("title"),
+            null().label("at")
+        ).select_from(Task).where(
+            and_(
+                Task.user_id == user_id,
+                Task.created_at >= today_start,
+                Task.created_at < tomorrow_start,
+                Task.status == "completed"
             )
         )
-        completed_tasks = tasks_result.scalars().all()
-        
-        # Get today's events
-        events_result = await db.execute(
-            select(Event).where(
-                and_(
-                    Event.user_id == user_id,
-                    func.date(Event.start_time) == today
-                )
+        events_q = select(
+            literal("events_today").label("kind"),
+            func.count().label("total"),
+            null().label("title"),
+            null().label("at")
+        ).select_from(Event).where(
+            and_(
+                Event.user_id == user_id,
+                Event.start_time >= today_start,
+                Event.start_time < tomorrow_start
             )
         )
-        events = events_result.scalars().all()
-        
-        # Get tomorrow's events for preview
-        tomorrow_events_result = await db.execute(
-            select(Event).where(
-                and_(
-                    Event.user_id == user_id,
-                    func.date(Event.start_time) == tomorrow
-                )
-            ).order_by(Event.start_time)
+        tomorrow_events_q = select(
+            literal("event_tomorrow").label("kind"),
+            literal(1).label("total"),
+            Event.title.label("title"),
+            Event.start_time.label("at")
+        ).where(
+            and_(
+                Event.user_id == user_id,
+                Event.start_time >= tomorrow_start,
+                Event.start_time < day_after_start
+            )
+        ).order_by(Event.start_time).limit(3)  # Show max 3 events
+        result = await db.execute(
+            union_all(completed_tasks_q, events_q, tomorrow_events_q)
         )
-        tomorrow_events = tomorrow_events_result.scalars().all()
+        
+        tasks_completed = 0
+        events_attended = 0
+        tomorrow_events = []
+        for row in result.all():
+            if row.kind == "completed_tasks":
+                tasks_completed = row.total
+            elif row.kind == "events_today":
+                events_attended = row.total
+            else:
+                tomorrow_events.append(row)
+        tomorrow_events.sort(key=lambda event: event.at)
         
         # Generate AI insights (simplified for now)
         insights = []
-        if len(completed_tasks) > 3:
+        if tasks_completed > 3:
             insights.append("Great productivity today! You completed more tasks than usual.")
-        if len(events) > 5:
+        if events_attended > 5:
             insights.append("Busy day with many meetings. Consider scheduling buffer time.")
-        if not completed_tasks:
+        if not tasks_completed:
             insights.append("No tasks completed today. Tomorrow is a fresh start!")
         
         # Generate tomorrow preview
         next_day_preview = []
-        for event in tomorrow_events[:3]:  # Show max 3 events
-            time_str = event.start_time.strftime("%I:%M %p")
+        for event in tomorrow_events:
+            time_str = _format_clock_time(event.at)
             next_day_preview.append(f"{time_str} - {event.title}")
         
         if not next_day_preview:
@@ -253,9 +417,9 @@ async def generate_daily_summary(db: AsyncSession, user_id: str) -> Optional[Dai
         
         return DailySummary(
             user_id=user_id,
-            summary_date=datetime.combine(today, datetime.min.time()),
-            tasks_completed=len(completed_tasks),
-            events_attended=len(events),
+            summary_date=today_start,
+            tasks_completed=tasks_completed,
+            events_attended=events_attended,
             ai_suggestions=[],  # Could be enhanced with ML recommendations
             insights=insights,
             next_day_preview=next_day_preview
@@ -299,9 +463,8 @@ class ConfirmationWorkflow:
             )
             
             # Schedule timeout task
-            process_confirmation_timeout_task.apply_async(
-                args=[str(response.id), user_id],
-                countdown=timeout_minutes * 60
+            schedule_confirmation_timeouts(
+                [(str(response.id), user_id, timeout_minutes * 60)]
             )
             
             # Log confirmation request
@@ -9,30 +9,30 @@
 4. پکیج‌های اضافی یا گم‌شده را نشان می‌دهد
 """
 
-import subprocess
 import re
 import sys
+from importlib.metadata import distributions
 from pathlib import Path
 from typing import Dict, Set, Tuple, Optional
 
+# الگوهای پارس requirements یک بار در سطح ماژول کامپایل می‌شوند
+# فرمت‌های مختلف: package==1.0.0, package>=1.0.0, package<2.0.0, package~=1.0.0
+_REQ_RE = re.compile(r'^([A-Za-z0-9_.-]+)(\[[^\]]+\])?\s*(==|>=|<=|~=|!=|<|>)\s*(.+)$')
+_EXTRAS_RE = re.compile(r'\[.*?\]')
+
 def get_installed_packages() -> Dict[str, str]:
-    """لیست پکیج‌های نصب شده را برمی‌گرداند."""
-    try:
-        result = subprocess.run(
-            [sys.executable, "-m", "pip", "list", "--format=freeze"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        packages = {}
-        for line in result.stdout.strip().split('\n'):
-            if '==' in line:
-                name, version = line.split('==', 1)
-                packages[name.lower()] = version
-        return packages
-    except subprocess.CalledProcessError as e:
-        print(f"❌ خطا در خواندن پکیج‌های نصب شده: {e}")
-        return {}
+    """
+    لیست پکیج‌های نصب شده را برمی‌گرداند.
+    
+    مستقیماً از متادیتای dist-info خوانده می‌شود تا نیازی به اجرای pip در یک پروسه جدا نباشد.
+    """
+    packages = {}
+    for dist in distributions():
+        name = dist.metadata['Name']
+        # مثل pip، اولین نسخه روی sys.path معتبر است
+        if name and name.lower() not in packages:
+            packages[name.lower()] = dist.version
+    return packages
 
 def parse_requirements(requirements_file: str) -> Dict[str, Optional[str]]:
     """
@@ -48,36 +48,32 @@ def parse_requirements(requirements_file: str) -> Dict[str, Optional[str]]:
         print(f"❌ فایل {requirements_file} پیدا نشد!")
         return packages
     
-    with open(requirements_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            
-            # نادیده گرفتن کامنت‌ها و خطوط خالی
-            if not line or line.startswith('#'):
-                continue
-            
-            # نادیده گرفتن --extra-index-url و سایر فلگ‌ها
-            if line.startswith('-'):
-                continue
-            
-            # حذف کامنت‌های inline
-            if '#' in line:
-                line = line.split('#')[0].strip()
-            
-            # پارس کردن نام و نسخه
-            # فرمت‌های مختلف: package==1.0.0, package>=1.0.0, package<2.0.0, package~=1.0.0
-            match = re.match(r'^([a-zA-Z0-9_-]+(?:\[[^\]]+\])?)(?:==|>=|<=|~=|!=|<|>)(.+)$', line)
-            if match:
-                package_name = match.group(1).lower()
-                # حذف [extras] از نام
-                package_name = re.sub(r'\[.*?\]', '', package_name)
-                version_spec = match.group(2).strip()
-                packages[package_name] = version_spec
-            else:
-                # پکیج بدون نسخه
-                package_name = line.split()[0].lower()
-                package_name = re.sub(r'\[.*?\]', '', package_name)
-                packages[package_name] = None
+    for line in requirements_path.read_text(encoding='utf-8').splitlines():
+        line = line.strip()
+        
+        # نادیده گرفتن کامنت‌ها و خطوط خالی
+        if not line or line.startswith('#'):
+            continue
+        
+        # نادیده گرفتن --extra-index-url و سایر فلگ‌ها
+        if line.startswith('-'):
+            continue
+        
+        # حذف کامنت‌های inline
+        if '#' in line:
+            line = line.split('#')[0].strip()
+        
+        # پارس کردن نام و نسخه ([extras] در گروه جدا می‌ماند و حذف می‌شود)
+        match = _REQ_RE.match(line)
+        if match:
+            package_name = match.group(1).lower()
+            version_spec = match.group(4).strip()
+            packages[package_name] = version_spec
+        else:
+            # پکیج بدون نسخه
+            package_name = line.split()[0].lower()
+            package_name = _EXTRAS_RE.sub('', package_name)
+            packages[package_name] = None
     
     return packages
 
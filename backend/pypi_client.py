@@ -0,0 +1,77 @@
+"""
+کلاینت async برای دریافت متادیتای پکیج‌ها از PyPI
+
+درخواست‌ها همزمان روی یک connection pool مشترک (keep-alive) ارسال می‌شوند
+و پاسخ‌ها تا CACHE_TTL در حافظه نگه داشته می‌شوند.
+"""
+
+import asyncio
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+PYPI_JSON_URL = "https://pypi.org/pypi/{name}/json"
+
+# حداکثر اتصال همزمان به PyPI
+MAX_CONNECTIONS = 32
+
+# مدت اعتبار پاسخ‌های کش شده
+CACHE_TTL = timedelta(hours=5)
+
+# کش {نام پکیج: (زمان انقضا، متادیتا)}
+_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+
+def _cached(name: str) -> Optional[Dict[str, Any]]:
+    """پاسخ کش شده و هنوز معتبر را برمی‌گرداند."""
+    entry = _cache.get(name)
+    if entry is None:
+        return None
+    expires_at, data = entry
+    if expires_at < time.monotonic():
+        del _cache[name]
+        return None
+    return data
+
+
+async def _fetch(session: aiohttp.ClientSession, name: str) -> Optional[Dict[str, Any]]:
+    """متادیتای یک پکیج را دریافت می‌کند (None اگر پیدا نشد یا خطا داد)."""
+    try:
+        async with session.get(PYPI_JSON_URL.format(name=name)) as response:
+            if response.status != 200:
+                return None
+            data = await response.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        return None
+
+    _cache[name] = (time.monotonic() + CACHE_TTL.total_seconds(), data)
+    return data
+
+
+async def fetch_all(names: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    متادیتای JSON چند پکیج را همزمان از PyPI دریافت می‌کند.
+
+    Returns:
+        دیکشنری {نام پکیج: متادیتا}؛ پکیج‌های ناموفق در خروجی نیستند
+    """
+    results = {}
+    missing = []
+    for name in dict.fromkeys(names):
+        data = _cached(name)
+        if data is not None:
+            results[name] = data
+        else:
+            missing.append(name)
+
+    if missing:
+        connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            fetched = await asyncio.gather(*[_fetch(session, name) for name in missing])
+        for name, data in zip(missing, fetched):
+            if data is not None:
+                results[name] = data
+
+    return results
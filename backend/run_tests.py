@@ -4,6 +4,12 @@ Simple test runner for backend tests.
 """
 import os
 import sys
+
+# Keep bytecode in a shared cache so repeated runs skip recompiling the app
+# import chain; must be set before any app module is imported.
+os.environ.setdefault('PYTHONPYCACHEPREFIX', '/tmp/pycache')
+sys.pycache_prefix = sys.pycache_prefix or os.environ['PYTHONPYCACHEPREFIX']
+
 import unittest
 from unittest.mock import patch
 
@@ -9,14 +9,56 @@
 4. فقط پکیج‌های اصلی را نگه می‌دارد (وابستگی‌های فرعی را اضافه نمی‌کند)
 """
 
+import os
 import subprocess
 import re
 import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, distributions, version
 from pathlib import Path
 from typing import Dict, Optional, List, Tuple
 
-def run_command(cmd: List[str], check: bool = True) -> Tuple[str, str, int]:
-    """اجرای یک دستور و برگرداندن خروجی."""
+from packaging.requirements import InvalidRequirement, Requirement
+
+# الگوهای ثابت یک بار در سطح ماژول کامپایل می‌شوند
+_EXTRAS_RE = re.compile(r'\[.*?\]')
+# خطوط pin شده (package[extras]==version) برای به‌روزرسانی یک‌جا با re.sub
+_PIN_RE = re.compile(r'^([ \t]*)([A-Za-z0-9_.\-]+)(\[[^\]]+\])?==([^\s,;#]+)', re.M)
+# نام، extras و version spec در یک پاس (خطوط با marker یا URL به پارسر کامل می‌روند)
+_REQ_RE = re.compile(
+    r'^(?P<name>[A-Za-z0-9_.\-]+)(?:\[(?P<extras>[^\]]+)\])?\s*'
+    r'(?P<spec>(?:==|>=|<=|~=|!=|<|>)[^;@]*)?$'
+)
+
+def run_command(
+    cmd: List[str],
+    check: bool = True,
+    spool: bool = False,
+    quiet: bool = False
+) -> Tuple[str, str, int]:
+    """
+    اجرای یک دستور و برگرداندن خروجی.
+    
+    با spool=True خروجی (مثلاً لاگ‌های حجیم pip install) به جای pipe در
+    فایل‌های موقت نوشته و در پایان یک‌جا خوانده می‌شود. با quiet=True
+    stdout اصلاً ذخیره نمی‌شود (DEVNULL) و فقط stderr برگردانده می‌شود.
+    """
+    if spool:
+        with tempfile.TemporaryFile('w+', encoding='utf-8') as out, \
+                tempfile.TemporaryFile('w+', encoding='utf-8') as err:
+            returncode = subprocess.run(
+                cmd,
+                stdout=subprocess.DEVNULL if quiet else out,
+                stderr=err,
+                bufsize=-1,
+                check=False
+            ).returncode
+            out.seek(0)
+            err.seek(0)
+            return out.read(), err.read(), returncode
+    
     try:
         result = subprocess.run(
             cmd,
@@ -30,22 +72,35 @@ def run_command(cmd: List[str], check: bool = True) -> Tuple[str, str, int]:
 
 def get_installed_version(package_name: str) -> Optional[str]:
     """نسخه نصب شده یک پکیج را برمی‌گرداند."""
-    stdout, stderr, code = run_command(
-        [sys.executable, "-m", "pip", "show", package_name],
-        check=False
-    )
-    if code != 0:
+    # نرمالایز قبل از کش تا requests و Requests یک ورودی مشترک داشته باشند
+    return _get_installed_version(normalize_package_name(package_name))
+
+@lru_cache(maxsize=None)
+def _get_installed_version(package_name: str) -> Optional[str]:
+    try:
+        return version(package_name)
+    except PackageNotFoundError:
         return None
+
+def load_installed_versions() -> Dict[str, str]:
+    """
+    نسخه همه پکیج‌های نصب شده را مستقیماً از متادیتای مفسر فعلی برمی‌گرداند.
     
-    for line in stdout.split('\n'):
-        if line.startswith('Version:'):
-            return line.split(':', 1)[1].strip()
-    return None
+    Returns:
+        دیکشنری {نام نرمالایز شده: نسخه}
+    """
+    installed = {}
+    for dist in distributions():
+        name = dist.metadata['Name']
+        # مثل pip، اولین نسخه روی sys.path معتبر است
+        if name:
+            installed.setdefault(normalize_package_name(name), dist.version)
+    return installed
 
 def normalize_package_name(name: str) -> str:
     """نام پکیج را نرمالایز می‌کند."""
     # حذف [extras]
-    name = re.sub(r'\[.*?\]', '', name).strip()
+    name = _EXTRAS_RE.sub('', name).strip()
     return name.lower().replace('-', '_').replace('.', '-')
 
 def parse_requirements_line(line: str) -> Tuple[Optional[str], Optional[str], str]:
@@ -69,38 +124,125 @@ def parse_requirements_line(line: str) -> Tuple[Optional[str], Optional[str], st
     if '#' in original:
         original = original.split('#')[0].strip()
     
-    # پارس کردن نام و نسخه
-    # فرمت‌ها: package==1.0.0, package>=1.0.0, package<2.0.0
-    match = re.match(r'^([a-zA-Z0-9_-]+(?:\[[^\]]+\])?)(.*)$', original)
-    if not match:
-        return None, None, original
+    # مسیر سریع: فرمت‌های ساده مثل package==1.0.0, package[extra]>=1.0.0
+    match = _REQ_RE.match(original)
+    if match:
+        spec = match.group('spec')
+        return match.group('name'), spec.strip() if spec else None, original
     
-    package_name = match.group(1)
-    rest = match.group(2).strip()
+    # پارس کردن نام و نسخه طبق PEP 508 (همان پارسری که pip استفاده می‌کند)
+    # فرمت‌ها: package==1.0.0, package>=1.0.0, package[extra]<2.0.0; marker
+    try:
+        requirement = Requirement(original)
+    except InvalidRequirement:
+        return None, None, original
     
-    # استخراج نام اصلی (بدون [extras])
-    base_name = re.sub(r'\[.*?\]', '', package_name).strip()
+    return requirement.name, str(requirement.specifier) or None, original
+
+def write_text(path: Path, text: str) -> None:
+    """متن را با یک فراخوانی os.write در فایل می‌نویسد."""
+    data = text.encode('utf-8')
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+def install_requirements(requirements_file: Path, verbose: bool = False) -> bool:
+    """
+    نصب requirements.txt
     
-    # استخراج version spec
-    version_spec = None
-    if rest:
-        # اگر version spec دارد
-        version_match = re.match(r'^(==|>=|<=|~=|!=|<|>)(.+)$', rest)
-        if version_match:
-            version_spec = rest
+    به طور پیش‌فرض خروجی pip دور ریخته می‌شود و فقط stderr برای گزارش خطا
+    نگه داشته می‌شود؛ با verbose=True خروجی pip مستقیماً در ترمینال نمایش داده می‌شود.
+    """
+    print("📦 در حال نصب پکیج‌ها از requirements.txt...")
+    if verbose:
+        stderr = ""
+        code = subprocess.run(
+            [sys.executable, "-m", "pip", "install", "-r", str(requirements_file)],
+            check=False
+        ).returncode
     else:
-        # بدون version spec
-        version_spec = None
+        _, stderr, code = run_command(
+            [sys.executable, "-m", "pip", "install", "-q", "-r", str(requirements_file)],
+            check=False,
+            spool=True,
+            quiet=True
+        )
+    
+    if code != 0:
+        print(f"❌ خطا در نصب پکیج‌ها:")
+        print(stderr)
+        return False
     
-    return base_name, version_spec, original
+    print("✅ نصب پکیج‌ها با موفقیت انجام شد")
+    return True
 
-def install_requirements(requirements_file: Path) -> bool:
-    """نصب requirements.txt"""
-    print("📦 در حال نصب پکیج‌ها از requirements.txt...")
-    stdout, stderr, code = run_command(
-        [sys.executable, "-m", "pip", "install", "-r", str(requirements_file)],
-        check=False
-    )
+def install_requirements_parallel(requirements_file: Path, workers: int = 4) -> bool:
+    """
+    دانلود موازی پکیج‌ها و سپس یک نصب سریالی از فایل‌های دانلود شده.
+    
+    پکیج‌ها به `workers` بخش تقسیم می‌شوند و هر بخش با `pip download` در
+    پوشه جداگانه خودش دانلود می‌شود (هیچ فرآیندی در site-packages نمی‌نویسد).
+    سپس یک `pip install --no-index` کل requirements.txt را با یک resolver
+    واحد از همان پوشه‌ها نصب می‌کند. در صورت خطای دانلود، به نصب سریالی
+    معمولی برمی‌گردیم.
+    """
+    flags = []
+    packages = []
+    for line in requirements_file.read_text(encoding='utf-8').splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            continue
+        if stripped.startswith('-'):
+            flags.append(stripped)
+        else:
+            packages.append(stripped)
+    
+    workers = max(1, min(workers, len(packages)))
+    if workers <= 1:
+        return install_requirements(requirements_file)
+    
+    print(f"📦 در حال دانلود پکیج‌ها از requirements.txt ({workers} فرآیند موازی)...")
+    
+    with tempfile.TemporaryDirectory(prefix='requirements-') as tmp:
+        shards = []
+        for i in range(workers):
+            shard_dir = Path(tmp) / f"shard-{i}"
+            shard_dir.mkdir()
+            shard_file = shard_dir / "requirements.txt"
+            write_text(shard_file, '\n'.join(flags + packages[i::workers]) + '\n')
+            shards.append((shard_file, shard_dir / "dist"))
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                lambda shard: run_command(
+                    [sys.executable, "-m", "pip", "download", "-q",
+                     "-d", str(shard[1]), "-r", str(shard[0])],
+                    check=False,
+                    spool=True,
+                    quiet=True
+                ),
+                shards
+            ))
+        
+        if any(code != 0 for _, _, code in results):
+            print("⚠️  دانلود موازی ناموفق بود، نصب به صورت سریالی...")
+            return install_requirements(requirements_file)
+        
+        print("📦 در حال نصب پکیج‌های دانلود شده...")
+        find_links = []
+        for _, dist_dir in shards:
+            find_links += ["--find-links", str(dist_dir)]
+        _, stderr, code = run_command(
+            [sys.executable, "-m", "pip", "install", "-q", "--no-index",
+             *find_links, "-r", str(requirements_file)],
+            check=False,
+            spool=True,
+            quiet=True
+        )
     
     if code != 0:
         print(f"❌ خطا در نصب پکیج‌ها:")
@@ -120,16 +262,33 @@ def update_requirements_file(requirements_file: Path) -> bool:
         return False
     
     # خواندن فایل فعلی
-    with open(requirements_file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+    text = requirements_file.read_text(encoding='utf-8')
     
     updated_lines = []
     updated_count = 0
     not_found = []
+    # پیام‌های پیشرفت جمع و در پایان یک‌جا نوشته می‌شوند (هشدارها فوراً چاپ می‌شوند)
+    progress: List[str] = []
+    
+    # یک بار فهرست پکیج‌های نصب شده را می‌گیریم (بعد از نصب، نه در سطح ماژول)
+    installed = load_installed_versions()
     
     print("\n🔄 به‌روزرسانی نسخه‌های پکیج‌ها...")
     
-    for line in lines:
+    # نسخه‌های pin شده (==) با یک re.sub روی کل فایل به‌روز می‌شوند
+    def bump_pinned(match: re.Match) -> str:
+        nonlocal updated_count
+        indent, package_name, extras, old_version = match.groups()
+        installed_version = installed.get(normalize_package_name(package_name), old_version)
+        if installed_version != old_version:
+            progress.append(f"   ✏️  {package_name}: {old_version} → {installed_version}\n")
+            updated_count += 1
+        return f"{indent}{package_name}{extras or ''}=={installed_version}"
+    
+    pinned_text = _PIN_RE.sub(bump_pinned, text)
+    
+    # بقیه خطوط (بدون نسخه، نصب نشده، و غیره) خط به خط بررسی می‌شوند
+    for line in pinned_text.splitlines(keepends=True):
         package_name, version_spec, original = parse_requirements_line(line)
         
         # اگر خط قابل پارس نیست (کامنت، فلگ، و غیره)، بدون تغییر نگه دار
@@ -138,7 +297,7 @@ def update_requirements_file(requirements_file: Path) -> bool:
             continue
         
         # دریافت نسخه واقعی نصب شده
-        installed_version = get_installed_version(package_name)
+        installed_version = installed.get(normalize_package_name(package_name))
         
         if installed_version is None:
             print(f"   ⚠️  {package_name}: نصب نشده است")
@@ -150,10 +309,18 @@ def update_requirements_file(requirements_file: Path) -> bool:
             if version_spec and '==' in version_spec:
                 old_version = version_spec.replace('==', '').strip()
                 if old_version != installed_version:
-                    # به‌روزرسانی نسخه
-                    new_line = line.replace(f'=={old_version}', f'=={installed_version}')
+                    # به‌روزرسانی نسخه: خط از اجزای پارس شده ساخته می‌شود
+                    extras = _EXTRAS_RE.search(original)
+                    marker = original.partition(';')[2].strip()
+                    comment = line.partition('#')[2].strip()
+                    new_line = f"{package_name}{extras.group(0) if extras else ''}=={installed_version}"
+                    if marker:
+                        new_line += f"; {marker}"
+                    if comment:
+                        new_line += f"  # {comment}"
+                    new_line += "\n"
                     updated_lines.append(new_line)
-                    print(f"   ✏️  {package_name}: {old_version} → {installed_version}")
+                    progress.append(f"   ✏️  {package_name}: {old_version} → {installed_version}\n")
                     updated_count += 1
                 else:
                     updated_lines.append(line)
@@ -166,21 +333,23 @@ def update_requirements_file(requirements_file: Path) -> bool:
                 base_line = original.split()[0]  # نام پکیج
                 new_line = f"{base_line}=={installed_version}\n"
                 updated_lines.append(new_line)
-                print(f"   ➕ {package_name}: =={installed_version} (اضافه شد)")
+                progress.append(f"   ➕ {package_name}: =={installed_version} (اضافه شد)\n")
                 updated_count += 1
     
-    # نوشتن فایل به‌روز شده
-    if updated_count > 0 or not_found:
+    sys.stdout.write(''.join(progress))
+    sys.stdout.flush()
+    
+    # نوشتن فایل به‌روز شده (فقط اگر محتوا واقعاً تغییر کرده باشد)
+    new_text = ''.join(updated_lines)
+    if new_text != text:
         backup_file = requirements_file.with_suffix('.txt.backup')
         print(f"\n💾 ایجاد backup: {backup_file}")
         
         # ذخیره backup
-        with open(backup_file, 'w', encoding='utf-8') as f:
-            f.writelines(lines)
+        write_text(backup_file, text)
         
         # نوشتن فایل جدید
-        with open(requirements_file, 'w', encoding='utf-8') as f:
-            f.writelines(updated_lines)
+        write_text(requirements_file, new_text)
         
         print(f"✅ requirements.txt به‌روزرسانی شد!")
         print(f"   • {updated_count} پکیج به‌روزرسانی شد")
@@ -190,6 +359,8 @@ def update_requirements_file(requirements_file: Path) -> bool:
         return True
     else:
         print("\n✅ همه نسخه‌ها قبلاً به‌روز بودند!")
+        if not_found:
+            print(f"   • ⚠️  {len(not_found)} پکیج نصب نشده بودند")
         return False
 
 def main():
@@ -202,8 +373,12 @@ def main():
     print("=" * 80)
     print()
     
-    # مرحله 1: نصب requirements.txt
-    if not install_requirements(requirements_file):
+    # مرحله 1: نصب requirements.txt (با --parallel-download دانلود موازی می‌شود)
+    if "--parallel-download" in sys.argv[1:]:
+        installed = install_requirements_parallel(requirements_file)
+    else:
+        installed = install_requirements(requirements_file)
+    if not installed:
         print("\n❌ عملیات نصب ناموفق بود!")
         sys.exit(1)
     
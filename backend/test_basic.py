@@ -7,52 +7,95 @@ import sys
 import tempfile
 from unittest.mock import patch, MagicMock
 
+import pytest
+
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# Test environment shared by every test in this module
+TEST_ENV = {
+    'DATABASE_URL': 'sqlite:///:memory:',
+    'SECRET_KEY': 'test_secret_key',
+    'JWT_PRIVATE_KEY': 'test_private_key',
+    'JWT_PUBLIC_KEY': 'test_public_key',
+    'REDIS_URL': 'redis://localhost:6379/0',
+    'CELERY_BROKER_URL': 'redis://localhost:6379/1',
+    'CELERY_RESULT_BACKEND': 'redis://localhost:6379/2'
+}
+
+# Library mocks, started once so the app import graph is built only once
+MOCKS = {}
+
+
+def start_mocks():
+    """Start the shared environment and library patches; returns the patchers."""
+    crypt_instance = MagicMock()
+    crypt_instance.hash.return_value = "hashed_password"
+    crypt_instance.verify.return_value = True
+    
+    patchers = {
+        'env': patch.dict(os.environ, TEST_ENV),
+        # Mock bcrypt to avoid dependency
+        'crypt': patch('passlib.context.CryptContext', return_value=crypt_instance),
+        # Mock JWT to avoid cryptography dependency
+        'jwt_encode': patch('jwt.encode', return_value="mock_jwt_token"),
+        # Mock Redis and Celery to avoid dependency
+        'redis': patch('redis.asyncio.from_url', return_value=MagicMock()),
+        'celery': patch('celery.Celery', return_value=MagicMock()),
+        'fastapi': patch('fastapi.FastAPI', return_value=MagicMock()),
+    }
+    for name, patcher in patchers.items():
+        MOCKS[name] = patcher.start()
+    return list(patchers.values())
+
+
+def stop_mocks(patchers):
+    """Stop patchers started by start_mocks."""
+    for patcher in reversed(patchers):
+        patcher.stop()
+    MOCKS.clear()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _mocks():
+    """Apply the shared patches once for the whole module."""
+    patchers = start_mocks()
+    yield MOCKS
+    stop_mocks(patchers)
+
+
 def test_password_hashing():
     """Test password hashing functionality."""
     print("Testing password hashing...")
     
-    # Mock bcrypt to avoid dependency
-    with patch('passlib.context.CryptContext') as mock_crypt:
-        mock_instance = MagicMock()
-        mock_instance.hash.return_value = "hashed_password"
-        mock_instance.verify.return_value = True
-        mock_crypt.return_value = mock_instance
-        
-        from app.services.auth import AuthService
-        
-        auth_service = AuthService()
-        
-        # Test hashing
-        password = "TestPassword123!"
-        hashed = auth_service.hash_password(password)
-        assert hashed == "hashed_password"
-        
-        # Test verification
-        assert auth_service.verify_password(password, hashed) is True
-        
-        print("✓ Password hashing works correctly")
+    from app.services.auth import AuthService
+    
+    auth_service = AuthService()
+    
+    # Test hashing
+    password = "TestPassword123!"
+    hashed = auth_service.hash_password(password)
+    assert hashed == "hashed_password"
+    
+    # Test verification
+    assert auth_service.verify_password(password, hashed) is True
+    
+    print("✓ Password hashing works correctly")
 
 def test_jwt_token_creation():
     """Test JWT token creation."""
     print("Testing JWT token creation...")
     
-    # Mock JWT to avoid cryptography dependency
-    with patch('jwt.encode') as mock_encode:
-        mock_encode.return_value = "mock_jwt_token"
-        
-        from app.services.auth import AuthService
-        
-        auth_service = AuthService()
-        auth_service.private_key = "mock_private_key"
-        auth_service.algorithm = "RS256"
-        
-        token = auth_service.create_access_token("user123", "test@example.com")
-        assert token == "mock_jwt_token"
-        
-        print("✓ JWT token creation works correctly")
+    from app.services.auth import AuthService
+    
+    auth_service = AuthService()
+    auth_service.private_key = "mock_private_key"
+    auth_service.algorithm = "RS256"
+    
+    token = auth_service.create_access_token("user123", "test@example.com")
+    assert token == "mock_jwt_token"
+    
+    print("✓ JWT token creation works correctly")
 
 def test_middleware_instantiation():
     """Test middleware can be instantiated."""
@@ -74,21 +117,12 @@ def test_celery_configuration():
     """Test Celery configuration."""
     print("Testing Celery configuration...")
     
-    # Mock Redis to avoid dependency
-    with patch('redis.asyncio.from_url') as mock_redis:
-        mock_redis.return_value = MagicMock()
-        
-        # Mock Celery to avoid dependency
-        with patch('celery.Celery') as mock_celery:
-            mock_celery_instance = MagicMock()
-            mock_celery.return_value = mock_celery_instance
-            
-            from app.celery_app import celery_app
-            
-            # Verify Celery app was configured
-            assert mock_celery.called
-            
-            print("✓ Celery configuration successful")
+    from app.celery_app import celery_app
+    
+    # Verify Celery app was configured
+    assert MOCKS['celery'].called
+    
+    print("✓ Celery configuration successful")
 
 def test_task_definitions():
     """Test task definitions can be imported."""
@@ -113,20 +147,16 @@ def test_api_structure():
     """Test API structure."""
     print("Testing API structure...")
     
-    # Mock FastAPI and dependencies
-    with patch('fastapi.FastAPI') as mock_fastapi:
-        with patch('app.database.base.engine'):
-            with patch('app.database.models.Base'):
-                mock_app = MagicMock()
-                mock_fastapi.return_value = mock_app
-                
-                # Import main app
-                from app.main import app
-                
-                # Verify app was created
-                assert mock_fastapi.called
-                
-                print("✓ API structure created successfully")
+    # Mock database dependencies
+    with patch('app.database.base.engine'):
+        with patch('app.database.models.Base'):
+            # Import main app
+            from app.main import app
+            
+            # Verify app was created
+            assert MOCKS['fastapi'].called
+            
+            print("✓ API structure created successfully")
 
 def run_all_tests():
     """Run all basic tests."""
@@ -134,46 +164,39 @@ def run_all_tests():
     print("=" * 40)
     
     # Set up test environment
-    test_env = {
-        'DATABASE_URL': 'sqlite:///:memory:',
-        'SECRET_KEY': 'test_secret_key',
-        'JWT_PRIVATE_KEY': 'test_private_key',
-        'JWT_PUBLIC_KEY': 'test_public_key',
-        'REDIS_URL': 'redis://localhost:6379/0',
-        'CELERY_BROKER_URL': 'redis://localhost:6379/1',
-        'CELERY_RESULT_BACKEND': 'redis://localhost:6379/2'
-    }
+    patchers = start_mocks()
     
-    with patch.dict(os.environ, test_env):
-        try:
-            test_password_hashing()
-            test_jwt_token_creation()
-            test_middleware_instantiation()
-            test_celery_configuration()
-            test_task_definitions()
-            test_api_structure()
-            
-            print("\n" + "=" * 40)
-            print("🎉 All backend foundation tests passed!")
-            print("\nImplemented components:")
-            print("• FastAPI application with middleware")
-            print("• JWT authentication system")
-            print("• Rate limiting and security headers")
-            print("• Celery task queue configuration")
-            print("• AI processing, calendar, messaging, and federated learning tasks")
-            print("• Database models and migrations")
-            print("• API endpoints for authentication")
-            print("• Comprehensive error handling")
-            print("• Request logging and correlation IDs")
-            print("• Prometheus metrics integration")
-            
-            return True
-            
-        except Exception as e:
-            print(f"\n❌ Test failed: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+    try:
+        test_password_hashing()
+        test_jwt_token_creation()
+        test_middleware_instantiation()
+        test_celery_configuration()
+        test_task_definitions()
+        test_api_structure()
+        
+        print("\n" + "=" * 40)
+        print("🎉 All backend foundation tests passed!")
+        print("\nImplemented components:")
+        print("• FastAPI application with middleware")
+        print("• JWT authentication system")
+        print("• Rate limiting and security headers")
+        print("• Celery task queue configuration")
+        print("• AI processing, calendar, messaging, and federated learning tasks")
+        print("• Database models and migrations")
+        print("• API endpoints for authentication")
+        print("• Comprehensive error handling")
+        print("• Request logging and correlation IDs")
+        print("• Prometheus metrics integration")
+        
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        stop_mocks(patchers)
 
 if __name__ == "__main__":
     success = run_all_tests()
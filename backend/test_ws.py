@@ -5,21 +5,41 @@ Minimal WebSocket test server - مستقل از FastAPI اصلی
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+import json
 import logging
 import time
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+
+def dumps(payload) -> str:
+    """Encode a payload for a text frame (orjson if available)."""
+    if orjson is not None:
+        return orjson.dumps(payload).decode()
+    return json.dumps(payload)
+
+
+def loads(text: str):
+    """Decode a JSON text frame (orjson if available)."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
 # CORS Configuration
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://localhost:3001"],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["authorization", "content-type", "x-correlation-id"],
 )
 
 @app.get("/")
@@ -38,50 +58,56 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     
     try:
         # Send welcome message
-        await websocket.send_json({
+        await websocket.send_text(dumps({
             "type": "session_started",
             "data": {"session_id": session_id, "message": "Connected successfully!"},
             "timestamp": time.time()
-        })
+        }))
         
         while True:
             # Receive message
-            data = await websocket.receive_json()
+            data = loads(await websocket.receive_text())
             logger.info(f"📩 Received: {data}")
             
             message_type = data.get("type")
+            # One timestamp per inbound message, shared by all replies to it
+            now = time.time()
+            # Replies to one inbound message are sent together as a single frame
+            events = []
             
             if message_type == "voice_start":
-                await websocket.send_json({
+                events.append({
                     "type": "session_started",
                     "data": {"status": "listening"},
-                    "timestamp": time.time()
+                    "timestamp": now
                 })
                 
             elif message_type == "voice_data":
-                await websocket.send_json({
+                events.append({
                     "type": "transcript_partial",
                     "data": {"text": "Listening..."},
-                    "timestamp": time.time()
+                    "timestamp": now
                 })
                 
             elif message_type == "voice_end":
-                await websocket.send_json({
+                events.append({
                     "type": "transcript_final",
                     "data": {"text": "Test transcription completed", "confidence": 0.95},
-                    "timestamp": time.time()
+                    "timestamp": now
                 })
-                await websocket.send_json({
+                events.append({
                     "type": "agent_response",
                     "data": {"text": "I heard you!", "audio_url": None},
-                    "timestamp": time.time()
+                    "timestamp": now
                 })
             else:
-                await websocket.send_json({
+                events.append({
                     "type": "echo",
                     "data": data,
-                    "timestamp": time.time()
+                    "timestamp": now
                 })
+            
+            await websocket.send_text(dumps(events[0] if len(events) == 1 else events))
                 
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected: {session_id}")
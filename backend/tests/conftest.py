@@ -1,6 +1,7 @@
 """
 Test configuration and fixtures.
 """
+import asyncio
 import pytest
 import sys
 import os
@@ -18,7 +19,7 @@ with patch.dict(os.environ, {
     'JWT_PUBLIC_KEY': 'test_public_key',
     'ENCRYPTION_MASTER_KEY': 'test_encryption_master_key_12345'
 }):
-    from sqlalchemy import create_engine
+    from sqlalchemy import create_engine, event
     from sqlalchemy.orm import sessionmaker
     from sqlalchemy.pool import StaticPool
     
@@ -27,27 +28,74 @@ with patch.dict(os.environ, {
     from app.database.models import *
 
 
-@pytest.fixture(scope="function")
-def db_session():
-    """Create a test database session."""
-    # Use in-memory SQLite for testing
+@pytest.fixture(scope="session")
+def app():
+    """Import the FastAPI application once, only for tests that need it."""
+    from app.main import app as application
+    return application
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    """Share one event loop across all async tests instead of one per test."""
+    loop = asyncio.new_event_loop()
+    try:
+        yield loop
+    finally:
+        loop.close()
+
+
+@pytest.fixture(scope="session")
+def _engine():
+    """Create the in-memory test database and its schema once per test run."""
     engine = create_engine(
         "sqlite:///:memory:",
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
     
+    # Let SQLAlchemy drive transactions so SAVEPOINTs work with pysqlite
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+    
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+    
     # Create all tables
     Base.metadata.create_all(bind=engine)
     
-    # Create session
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def db_session(_engine):
+    """Create a test database session rolled back after each test."""
+    connection = _engine.connect()
+    transaction = connection.begin()
+    
+    # Commits inside a test only release a SAVEPOINT; the outer transaction
+    # is rolled back afterwards so every test starts from an empty schema.
+    # Objects stay loaded after commit, so reading e.g. event.id needs no SELECT
+    TestingSessionLocal = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+        bind=connection,
+        join_transaction_mode="create_savepoint",
+    )
     session = TestingSessionLocal()
     
     try:
         yield session
     finally:
         session.close()
+        transaction.rollback()
+        connection.close()
 
 
 @pytest.fixture
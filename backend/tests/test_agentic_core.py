@@ -6,6 +6,9 @@ verifies task planning and execution with complex multi-step scenarios.
 """
 import pytest
 import asyncio
+import contextvars
+import re
+import time
 from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime, timedelta
 from uuid import uuid4
@@ -13,6 +16,9 @@ from typing import Dict, List, Optional, Any
 from enum import Enum
 from dataclasses import dataclass
 
+# Words that show the agent is asking the user to clarify an unclear request
+_CLARIFY_RE = re.compile(r"understand|clarification|help|specific|rephrase", re.IGNORECASE)
+
 # Import core components individually to avoid service dependencies
 try:
     from app.core.intent_recognizer import IntentRecognizer, IntentResult, IntentType
@@ -120,7 +126,7 @@ except ImportError as e:
                     )
             
             # System control patterns
-            if text_lower.strip() in ["stop", "pause", "halt"]:
+            if text_lower.strip() in ["stop", "pause", "halt", "resume"]:
                 return IntentResult(
                     intent=IntentType.SYSTEM_CONTROL,
                     confidence=0.9,
@@ -166,132 +172,121 @@ class TestIntentRecognizer:
         return IntentRecognizer()
     
     @pytest.mark.asyncio
-    async def test_calendar_create_intent_recognition(self, intent_recognizer):
+    @pytest.mark.parametrize("input_text,expected_intent", [
+        ("Schedule a meeting with John tomorrow at 3 PM", IntentType.CALENDAR_CREATE),
+        ("Book an appointment for next Tuesday at 10 AM", IntentType.CALENDAR_CREATE),
+        ("Create an event called team standup for Friday", IntentType.CALENDAR_CREATE),
+        ("Add a dentist appointment to my calendar", IntentType.CALENDAR_CREATE),
+        ("Plan a lunch meeting with Sarah next week", IntentType.CALENDAR_CREATE),
+        ("Set up a conference call for Monday morning", IntentType.CALENDAR_CREATE)
+    ])
+    async def test_calendar_create_intent_recognition(self, intent_recognizer, input_text, expected_intent):
         """Test calendar creation intent recognition with various patterns."""
         
-        test_cases = [
-            ("Schedule a meeting with John tomorrow at 3 PM", IntentType.CALENDAR_CREATE),
-            ("Book an appointment for next Tuesday at 10 AM", IntentType.CALENDAR_CREATE),
-            ("Create an event called team standup for Friday", IntentType.CALENDAR_CREATE),
-            ("Add a dentist appointment to my calendar", IntentType.CALENDAR_CREATE),
-            ("Plan a lunch meeting with Sarah next week", IntentType.CALENDAR_CREATE),
-            ("Set up a conference call for Monday morning", IntentType.CALENDAR_CREATE)
-        ]
+        result = await intent_recognizer.recognize_intent(input_text, "user_123")
         
-        for input_text, expected_intent in test_cases:
-            result = await intent_recognizer.recognize_intent(input_text, "user_123")
-            
-            assert result.intent == expected_intent
-            assert result.confidence >= 0.8
-            assert isinstance(result.entities, dict)
-            
-            # Verify entities extraction
-            if "meeting" in input_text.lower():
-                assert "title" in result.entities or len(result.entities) > 0
+        assert result.intent == expected_intent
+        assert result.confidence >= 0.8
+        assert isinstance(result.entities, dict)
+        
+        # Verify entities extraction
+        if "meeting" in input_text.lower():
+            assert "title" in result.entities or len(result.entities) > 0
     
     @pytest.mark.asyncio
-    async def test_calendar_query_intent_recognition(self, intent_recognizer):
+    @pytest.mark.parametrize("input_text,expected_intent", [
+        ("What's my schedule for today?", IntentType.CALENDAR_QUERY),
+        ("Show me my calendar for tomorrow", IntentType.CALENDAR_QUERY),
+        ("Check my availability this afternoon", IntentType.CALENDAR_QUERY),
+        ("When am I free next week?", IntentType.CALENDAR_QUERY),
+        ("List my meetings for Friday", IntentType.CALENDAR_QUERY),
+        ("What appointments do I have?", IntentType.CALENDAR_QUERY)
+    ])
+    async def test_calendar_query_intent_recognition(self, intent_recognizer, input_text, expected_intent):
         """Test calendar query intent recognition."""
         
-        test_cases = [
-            ("What's my schedule for today?", IntentType.CALENDAR_QUERY),
-            ("Show me my calendar for tomorrow", IntentType.CALENDAR_QUERY),
-            ("Check my availability this afternoon", IntentType.CALENDAR_QUERY),
-            ("When am I free next week?", IntentType.CALENDAR_QUERY),
-            ("List my meetings for Friday", IntentType.CALENDAR_QUERY),
-            ("What appointments do I have?", IntentType.CALENDAR_QUERY)
-        ]
+        result = await intent_recognizer.recognize_intent(input_text, "user_123")
         
-        for input_text, expected_intent in test_cases:
-            result = await intent_recognizer.recognize_intent(input_text, "user_123")
-            
-            assert result.intent == expected_intent
-            assert result.confidence >= 0.8
-            
-            # Verify time-related entities are extracted
-            if "today" in input_text.lower() or "tomorrow" in input_text.lower():
-                assert "date" in result.entities or "time" in result.entities
+        assert result.intent == expected_intent
+        assert result.confidence >= 0.8
+        
+        # Verify time-related entities are extracted
+        if "today" in input_text.lower() or "tomorrow" in input_text.lower():
+            assert "date" in result.entities or "time" in result.entities
     
     @pytest.mark.asyncio
-    async def test_task_management_intent_recognition(self, intent_recognizer):
+    @pytest.mark.parametrize("input_text,expected_intent", [
+        ("Remind me to call mom tonight", IntentType.TASK_CREATE),
+        ("Add buy groceries to my todo list", IntentType.TASK_CREATE),
+        ("Don't forget to submit the report", IntentType.TASK_CREATE),
+        ("What tasks do I have for today?", IntentType.TASK_QUERY),
+        ("Show me my reminders", IntentType.TASK_QUERY),
+        ("Mark the presentation task as done", IntentType.TASK_COMPLETE),
+        ("I completed the grocery shopping", IntentType.TASK_COMPLETE)
+    ])
+    async def test_task_management_intent_recognition(self, intent_recognizer, input_text, expected_intent):
         """Test task management intent recognition."""
         
-        test_cases = [
-            ("Remind me to call mom tonight", IntentType.TASK_CREATE),
-            ("Add buy groceries to my todo list", IntentType.TASK_CREATE),
-            ("Don't forget to submit the report", IntentType.TASK_CREATE),
-            ("What tasks do I have for today?", IntentType.TASK_QUERY),
-            ("Show me my reminders", IntentType.TASK_QUERY),
-            ("Mark the presentation task as done", IntentType.TASK_COMPLETE),
-            ("I completed the grocery shopping", IntentType.TASK_COMPLETE)
-        ]
+        result = await intent_recognizer.recognize_intent(input_text, "user_123")
         
-        for input_text, expected_intent in test_cases:
-            result = await intent_recognizer.recognize_intent(input_text, "user_123")
-            
-            assert result.intent == expected_intent
-            assert result.confidence >= 0.8
-            
-            # Verify task-related entities
-            if expected_intent == IntentType.TASK_CREATE:
-                assert "title" in result.entities or len(result.entities) > 0
+        assert result.intent == expected_intent
+        assert result.confidence >= 0.8
+        
+        # Verify task-related entities
+        if expected_intent == IntentType.TASK_CREATE:
+            assert "title" in result.entities or len(result.entities) > 0
     
     @pytest.mark.asyncio
-    async def test_messaging_intent_recognition(self, intent_recognizer):
+    @pytest.mark.parametrize("input_text,expected_intent", [
+        ("Send a WhatsApp message to John", IntentType.MESSAGE_SEND),
+        ("Text Sarah about the meeting", IntentType.MESSAGE_SEND),
+        ("Message the team about the delay", IntentType.MESSAGE_SEND),
+        ("Send a reminder message tomorrow", IntentType.MESSAGE_REMINDER)
+    ])
+    async def test_messaging_intent_recognition(self, intent_recognizer, input_text, expected_intent):
         """Test messaging intent recognition."""
         
-        test_cases = [
-            ("Send a WhatsApp message to John", IntentType.MESSAGE_SEND),
-            ("Text Sarah about the meeting", IntentType.MESSAGE_SEND),
-            ("Message the team about the delay", IntentType.MESSAGE_SEND),
-            ("Send a reminder message tomorrow", IntentType.MESSAGE_REMINDER)
-        ]
+        result = await intent_recognizer.recognize_intent(input_text, "user_123")
         
-        for input_text, expected_intent in test_cases:
-            result = await intent_recognizer.recognize_intent(input_text, "user_123")
-            
-            assert result.intent == expected_intent
-            assert result.confidence >= 0.8
-            
-            # Verify people entities are extracted
-            if "john" in input_text.lower() or "sarah" in input_text.lower():
-                assert "people" in result.entities
+        assert result.intent == expected_intent
+        assert result.confidence >= 0.8
+        
+        # Verify people entities are extracted
+        if "john" in input_text.lower() or "sarah" in input_text.lower():
+            assert "people" in result.entities
     
     @pytest.mark.asyncio
-    async def test_system_control_intent_recognition(self, intent_recognizer):
+    @pytest.mark.parametrize("input_text,expected_intent", [
+        ("Stop", IntentType.SYSTEM_CONTROL),
+        ("Resume", IntentType.SYSTEM_CONTROL),
+        ("Pause all operations", IntentType.SYSTEM_CONTROL),
+        ("Help me with calendar", IntentType.SYSTEM_CONTROL),
+        ("Show me the settings", IntentType.SYSTEM_CONTROL)
+    ])
+    async def test_system_control_intent_recognition(self, intent_recognizer, input_text, expected_intent):
         """Test system control intent recognition."""
         
-        test_cases = [
-            ("Stop", IntentType.SYSTEM_CONTROL),
-            ("Pause all operations", IntentType.SYSTEM_CONTROL),
-            ("Help me with calendar", IntentType.SYSTEM_CONTROL),
-            ("Show me the settings", IntentType.SYSTEM_CONTROL)
-        ]
+        result = await intent_recognizer.recognize_intent(input_text, "user_123")
         
-        for input_text, expected_intent in test_cases:
-            result = await intent_recognizer.recognize_intent(input_text, "user_123")
-            
-            assert result.intent == expected_intent
-            assert result.confidence >= 0.8
+        assert result.intent == expected_intent
+        assert result.confidence >= 0.8
     
     @pytest.mark.asyncio
-    async def test_unknown_intent_handling(self, intent_recognizer):
+    @pytest.mark.parametrize("input_text", [
+        "The weather is nice today",
+        "Random text without clear intent",
+        "Blah blah blah",
+        "What is the meaning of life?"
+    ])
+    async def test_unknown_intent_handling(self, intent_recognizer, input_text):
         """Test handling of unclear or unknown intents."""
         
-        unclear_inputs = [
-            "The weather is nice today",
-            "Random text without clear intent",
-            "Blah blah blah",
-            "What is the meaning of life?"
-        ]
+        result = await intent_recognizer.recognize_intent(input_text, "user_123")
         
-        for input_text in unclear_inputs:
-            result = await intent_recognizer.recognize_intent(input_text, "user_123")
-            
-            # Should either be UNKNOWN or GENERAL_QUERY with low confidence
-            assert result.intent in [IntentType.UNKNOWN, IntentType.GENERAL_QUERY]
-            if result.intent == IntentType.UNKNOWN:
-                assert result.confidence < 0.5
+        # Should either be UNKNOWN or GENERAL_QUERY with low confidence
+        assert result.intent in [IntentType.UNKNOWN, IntentType.GENERAL_QUERY]
+        if result.intent == IntentType.UNKNOWN:
+            assert result.confidence < 0.5
     
     @pytest.mark.asyncio
     async def test_context_awareness(self, intent_recognizer):
@@ -357,6 +352,80 @@ class TestIntentRecognizer:
                         # Check if expected value is in extracted string
                         assert any(val.lower() in str(extracted).lower() for val in expected_values)
 
+    @pytest.mark.skipif(not CORE_IMPORTS_AVAILABLE, reason="Core intent recognizer not available")
+    @pytest.mark.asyncio
+    async def test_repeated_input_uses_cache(self, intent_recognizer):
+        """Test repeated inputs reuse the cached pattern result without sharing it."""
+
+        result1 = await intent_recognizer.recognize_intent("Schedule a meeting with John", "user_123")
+        result1.entities["title"] = "changed"
+        result2 = await intent_recognizer.recognize_intent("Schedule a meeting with John", "user_123")
+
+        assert result2.intent == result1.intent
+        assert result2.entities.get("title") != "changed"
+        assert intent_recognizer._cached_pattern_recognition.cache_info().hits == 1
+
+    @pytest.mark.skipif(not CORE_IMPORTS_AVAILABLE, reason="Core intent recognizer not available")
+    @pytest.mark.asyncio
+    async def test_identical_input_shares_cache_across_users(self, intent_recognizer):
+        """Test concurrent users sending the same text pattern-scan it only once."""
+
+        await asyncio.gather(*(
+            intent_recognizer.recognize_intent("What's my schedule for today?", f"user_{i}")
+            for i in range(5)
+        ))
+
+        cache_info = intent_recognizer._cached_pattern_recognition.cache_info()
+        assert cache_info.misses == 1
+        assert cache_info.hits == 4
+
+    @pytest.mark.skipif(not CORE_IMPORTS_AVAILABLE, reason="Core intent recognizer not available")
+    @pytest.mark.asyncio
+    async def test_follow_up_reuses_entity_history(self, intent_recognizer):
+        """Test follow-ups of the same intent keep entities from earlier turns."""
+
+        await intent_recognizer.recognize_intent("Schedule a meeting with John", "user_123")
+        result = await intent_recognizer.recognize_intent("Set up a meeting tomorrow at 3 PM", "user_123")
+
+        assert result.intent == IntentType.CALENDAR_CREATE
+        assert result.entities.get("people") == ["john"]
+        assert "tomorrow" in result.entities.get("date", [])
+
+        await intent_recognizer.clear_conversation_context("user_123")
+        assert "user_123" not in intent_recognizer.entity_history
+
+    @pytest.mark.asyncio
+    async def test_unknown_follow_up_does_not_inherit_entities(self, intent_recognizer):
+        """Test unclassified follow-ups do not pick up entities from earlier turns."""
+
+        unknown = IntentResult(
+            intent=IntentType.UNKNOWN, confidence=0.1, entities={}, context={"method": "llm_based"}
+        )
+        with patch.object(intent_recognizer, "_llm_based_recognition", AsyncMock(return_value=unknown)):
+            await intent_recognizer.recognize_intent("Schedule a meeting with John", "user_123")
+            await intent_recognizer.recognize_intent("Make it tomorrow at 3 PM", "user_123")
+            result = await intent_recognizer.recognize_intent("Schedule it tomorrow at 3 PM", "user_123")
+
+        assert result.intent == IntentType.UNKNOWN
+        assert "people" not in result.entities
+
+    @pytest.mark.skipif(not CORE_IMPORTS_AVAILABLE, reason="Core intent recognizer not available")
+    @pytest.mark.asyncio
+    async def test_separate_requests_do_not_share_entities(self, intent_recognizer):
+        """Test a new request of the same intent does not inherit the previous one's entities."""
+
+        await intent_recognizer.recognize_intent("Schedule a meeting with John", "user_123")
+
+        # Age the first turn past the follow-up window
+        last_turn = intent_recognizer.conversation_state["user_123"]["history"][-1]
+        last_turn["timestamp"] = (datetime.now() - timedelta(hours=1)).isoformat()
+
+        result = await intent_recognizer.recognize_intent("Schedule a dentist appointment tomorrow", "user_123")
+
+        assert result.intent == IntentType.CALENDAR_CREATE
+        assert "people" not in result.entities
+        assert "people" not in intent_recognizer.entity_history["user_123"]
+
 
 class TestTaskPlanner:
     """Test task planning and execution with complex multi-step scenarios."""
@@ -437,7 +506,7 @@ class TestTaskPlanner:
         # Check that dependencies were respected
         for action in completed_actions:
             for dep_id in action.dependencies:
-                dep_action = next((a for a in result_plan.actions if a.id == dep_id), None)
+                dep_action = result_plan.get_action(dep_id)
                 assert dep_action is not None
                 assert dep_action.status == TaskStatus.COMPLETED
     
@@ -547,9 +616,9 @@ class TestTaskPlanner:
         
         task_planner.active_plans[plan.id] = plan
         
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         result_plan = await task_planner.execute_task_plan(plan.id)
-        execution_time = (datetime.now() - start_time).total_seconds()
+        execution_time = time.perf_counter() - start_time
         
         # All actions should complete
         completed_actions = [a for a in result_plan.actions if a.status == TaskStatus.COMPLETED]
@@ -744,9 +813,7 @@ class TestAgenticCore:
         
         assert isinstance(response, AgentResponse)
         # Should ask for clarification or provide help
-        assert any(word in response.text.lower() for word in [
-            "understand", "clarification", "help", "specific", "rephrase"
-        ])
+        assert _CLARIFY_RE.search(response.text) is not None
     
     @pytest.mark.asyncio
     async def test_context_awareness_across_interactions(self, agentic_core):
@@ -818,17 +885,22 @@ class TestAgenticCore:
     async def test_concurrent_user_sessions(self, agentic_core):
         """Test handling multiple concurrent user sessions."""
         
-        # Simulate concurrent requests from different users
-        tasks = []
-        for i in range(5):
-            task = agentic_core.process_user_input(
-                text=f"What's my schedule for today?",
-                user_id=f"user_{i}"
-            )
-            tasks.append(task)
+        # Simulate concurrent requests from different users, each in its own
+        # empty context so per-request context variables cannot leak between them
+        async with asyncio.TaskGroup() as task_group:
+            tasks = [
+                task_group.create_task(
+                    agentic_core.process_user_input(
+                        text="What's my schedule for today?",
+                        user_id=f"user_{i}"
+                    ),
+                    context=contextvars.Context()
+                )
+                for i in range(5)
+            ]
         
         # All should complete successfully
-        responses = await asyncio.gather(*tasks, return_exceptions=True)
+        responses = [task.result() for task in tasks]
         
         for response in responses:
             assert isinstance(response, AgentResponse)
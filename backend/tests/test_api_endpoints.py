@@ -1,59 +1,140 @@
 """
 Unit tests for API endpoints.
 """
+import httpx
+import json
 import pytest
-from unittest.mock import patch, MagicMock
+import pytest_asyncio
+from dataclasses import dataclass
+from types import SimpleNamespace
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from datetime import datetime, timedelta
 import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
 
-from app.main import app
-from app.database.models import User, UserSettings, AuditLog
-from app.services.auth import auth_service
+# Fixed timestamp for mocked users and token responses
+_FIXED_NOW = datetime(2024, 1, 1, 12, 0, 0)
+
+
+@dataclass(slots=True)
+class FakeUser:
+    """Plain stand-in for the User model in mocked auth service results."""
+    id: str
+    email: str
+    timezone: str = "UTC"
+    language_preference: str = "en-US"
+    created_at: datetime = _FIXED_NOW
+
+
+# Request bodies shared by the auth tests, serialized once
+_JSON_HEADERS = {"content-type": "application/json"}
+_REGISTRATION_BODY = json.dumps({
+    "email": "test@example.com",
+    "password": "SecurePassword123!",
+    "timezone": "UTC",
+    "language_preference": "en-US"
+}).encode()
+_LOGIN_BODY = json.dumps({
+    "email": "test@example.com",
+    "password": "SecurePassword123!"
+}).encode()
+_REFRESH_BODY = json.dumps({"refresh_token": "valid_refresh_token"}).encode()
+
+# Token responses returned by the mocked auth service
+TOKEN_RESPONSE = SimpleNamespace(
+    access_token="access_token",
+    refresh_token="refresh_token",
+    token_type="bearer",
+    expires_in=1800,
+    user=SimpleNamespace(
+        id="user123",
+        email="test@example.com",
+        timezone="UTC",
+        language_preference="en-US",
+        created_at=_FIXED_NOW
+    )
+)
+REFRESHED_TOKEN_RESPONSE = SimpleNamespace(
+    access_token="new_access_token",
+    refresh_token="new_refresh_token",
+    token_type="bearer",
+    expires_in=1800,
+    user=TOKEN_RESPONSE.user
+)
+
+
+@pytest.fixture(scope="module")
+def client(app):
+    """Create one test client, running the app lifespan once, for the module."""
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest_asyncio.fixture
+async def aclient(app):
+    """Create an async client that calls the ASGI app directly on the test's event loop."""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def bearer_headers():
+    """Sign one RS256 access token and reuse its headers for the whole session."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    token = jwt.encode(
+        {"sub": "user123", "exp": datetime.utcnow() + timedelta(hours=1)},
+        private_key,
+        algorithm="RS256"
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _mock_auth_dispatch(request, call_next):
+    """Stand-in for JWTAuthMiddleware.dispatch that authenticates as user123."""
+    request.state.user_id = "user123"
+    return await call_next(request)
+
+
+@pytest.fixture
+def authenticated_user():
+    """Treat every request as coming from user123."""
+    with patch('app.middleware.auth.JWTAuthMiddleware.dispatch', side_effect=_mock_auth_dispatch):
+        yield "user123"
+
+
+@pytest.fixture
+def mock_auth_service():
+    """Replace the auth service used by the auth routes with a mock."""
+    with patch('app.api.v1.auth.auth_service') as mock_auth_service:
+        yield mock_auth_service
+
+
+@pytest.fixture(scope="module")
+def openapi_schema(client):
+    """Fetch the OpenAPI schema once; FastAPI keeps it in app.openapi_schema."""
+    response = client.get("/api/v1/openapi.json")
+    assert response.status_code == 200
+    return response.json()
 
 
 class TestAuthEndpoints:
     """Test authentication API endpoints."""
     
-    def setup_method(self):
-        """Set up test client."""
-        self.client = TestClient(app)
-    
-    @patch('app.api.v1.auth.auth_service')
-    def test_register_user_success(self, mock_auth_service, db_session):
+    def test_register_user_success(self, client, mock_auth_service):
         """Test successful user registration."""
         # Mock auth service
-        mock_user = User(
+        mock_user = FakeUser(
             id="user123",
             email="test@example.com",
             timezone="UTC",
             language_preference="en-US"
         )
         mock_auth_service.create_user.return_value = mock_user
-        mock_auth_service.create_token_response.return_value = MagicMock(
-            access_token="access_token",
-            refresh_token="refresh_token",
-            token_type="bearer",
-            expires_in=1800,
-            user=MagicMock(
-                id="user123",
-                email="test@example.com",
-                timezone="UTC",
-                language_preference="en-US",
-                created_at=datetime.now()
-            )
-        )
-        
-        # Registration data
-        registration_data = {
-            "email": "test@example.com",
-            "password": "SecurePassword123!",
-            "timezone": "UTC",
-            "language_preference": "en-US"
-        }
+        mock_auth_service.create_token_response.return_value = TOKEN_RESPONSE
         
         # Make request
-        response = self.client.post("/api/v1/auth/register", json=registration_data)
+        response = client.post("/api/v1/auth/register", content=_REGISTRATION_BODY, headers=_JSON_HEADERS)
         
         # Verify response
         assert response.status_code == 201
@@ -67,62 +148,33 @@ class TestAuthEndpoints:
         mock_auth_service.create_user.assert_called_once()
         mock_auth_service.create_token_response.assert_called_once()
     
-    def test_register_user_invalid_password(self):
-        """Test user registration with invalid password."""
-        registration_data = {
-            "email": "test@example.com",
-            "password": "weak",  # Too weak
-            "timezone": "UTC"
-        }
-        
-        response = self.client.post("/api/v1/auth/register", json=registration_data)
-        
-        # Should return validation error
-        assert response.status_code == 422
-        assert "validation error" in response.json()["detail"][0]["type"]
-    
-    def test_register_user_invalid_email(self):
-        """Test user registration with invalid email."""
-        registration_data = {
-            "email": "invalid-email",
-            "password": "SecurePassword123!",
-            "timezone": "UTC"
-        }
-        
-        response = self.client.post("/api/v1/auth/register", json=registration_data)
+    @pytest.mark.parametrize("registration_data,expected_type", [
+        # Too weak password
+        ({"email": "test@example.com", "password": "weak", "timezone": "UTC"}, "validation error"),
+        # Invalid email
+        ({"email": "invalid-email", "password": "SecurePassword123!", "timezone": "UTC"}, None),
+    ])
+    def test_register_user_invalid_data(self, client, registration_data, expected_type):
+        """Test user registration with invalid password or email."""
+        response = client.post("/api/v1/auth/register", json=registration_data)
         
         # Should return validation error
         assert response.status_code == 422
+        if expected_type:
+            assert expected_type in response.json()["detail"][0]["type"]
     
-    @patch('app.api.v1.auth.auth_service')
-    def test_login_user_success(self, mock_auth_service):
+    def test_login_user_success(self, client, mock_auth_service):
         """Test successful user login."""
         # Mock auth service
-        mock_user = User(
+        mock_user = FakeUser(
             id="user123",
             email="test@example.com"
         )
         mock_auth_service.authenticate_user.return_value = mock_user
-        mock_auth_service.create_token_response.return_value = MagicMock(
-            access_token="access_token",
-            refresh_token="refresh_token",
-            token_type="bearer",
-            expires_in=1800,
-            user=MagicMock(
-                id="user123",
-                email="test@example.com",
-                created_at=datetime.now()
-            )
-        )
-        
-        # Login data
-        login_data = {
-            "email": "test@example.com",
-            "password": "SecurePassword123!"
-        }
+        mock_auth_service.create_token_response.return_value = TOKEN_RESPONSE
         
         # Make request
-        response = self.client.post("/api/v1/auth/login", json=login_data)
+        response = client.post("/api/v1/auth/login", content=_LOGIN_BODY, headers=_JSON_HEADERS)
         
         # Verify response
         assert response.status_code == 200
@@ -133,44 +185,28 @@ class TestAuthEndpoints:
         # Verify auth service was called
         mock_auth_service.authenticate_user.assert_called_once()
     
-    @patch('app.api.v1.auth.auth_service')
-    def test_login_user_invalid_credentials(self, mock_auth_service):
+    def test_login_user_invalid_credentials(self, client):
         """Test login with invalid credentials."""
-        # Mock auth service to return None (authentication failed)
-        mock_auth_service.authenticate_user.return_value = None
-        
         login_data = {
             "email": "test@example.com",
             "password": "wrong_password"
         }
         
-        response = self.client.post("/api/v1/auth/login", json=login_data)
+        # Mock auth service to return None (authentication failed)
+        with patch('app.api.v1.auth.auth_service') as mock_auth_service:
+            mock_auth_service.authenticate_user.return_value = None
+            response = client.post("/api/v1/auth/login", json=login_data)
         
         # Should return 401 Unauthorized
         assert response.status_code == 401
         assert "Invalid email or password" in response.json()["detail"]
     
-    @patch('app.api.v1.auth.auth_service')
-    def test_refresh_token_success(self, mock_auth_service):
+    def test_refresh_token_success(self, client, mock_auth_service):
         """Test successful token refresh."""
         # Mock auth service
-        mock_auth_service.refresh_access_token.return_value = MagicMock(
-            access_token="new_access_token",
-            refresh_token="new_refresh_token",
-            token_type="bearer",
-            expires_in=1800,
-            user=MagicMock(
-                id="user123",
-                email="test@example.com",
-                created_at=datetime.now()
-            )
-        )
+        mock_auth_service.refresh_access_token.return_value = REFRESHED_TOKEN_RESPONSE
         
-        refresh_data = {
-            "refresh_token": "valid_refresh_token"
-        }
-        
-        response = self.client.post("/api/v1/auth/refresh", json=refresh_data)
+        response = client.post("/api/v1/auth/refresh", content=_REFRESH_BODY, headers=_JSON_HEADERS)
         
         # Verify response
         assert response.status_code == 200
@@ -181,39 +217,37 @@ class TestAuthEndpoints:
         # Verify auth service was called
         mock_auth_service.refresh_access_token.assert_called_once()
     
-    @patch('app.api.v1.auth.auth_service')
-    def test_refresh_token_invalid(self, mock_auth_service):
+    def test_refresh_token_invalid(self, client):
         """Test token refresh with invalid token."""
-        # Mock auth service to return None (invalid token)
-        mock_auth_service.refresh_access_token.return_value = None
-        
         refresh_data = {
             "refresh_token": "invalid_refresh_token"
         }
         
-        response = self.client.post("/api/v1/auth/refresh", json=refresh_data)
+        # Mock auth service to return None (invalid token)
+        with patch('app.api.v1.auth.auth_service') as mock_auth_service:
+            mock_auth_service.refresh_access_token.return_value = None
+            response = client.post("/api/v1/auth/refresh", json=refresh_data)
         
         # Should return 401 Unauthorized
         assert response.status_code == 401
         assert "Invalid or expired refresh token" in response.json()["detail"]
     
-    def test_get_current_user_no_auth(self):
+    def test_get_current_user_no_auth(self, client):
         """Test getting current user without authentication."""
-        response = self.client.get("/api/v1/auth/me")
+        response = client.get("/api/v1/auth/me")
         
         # Should return 401 Unauthorized (JWT middleware)
         assert response.status_code == 401
     
-    @patch('app.api.v1.auth.auth_service')
     def test_get_current_user_success(self, mock_auth_service):
         """Test getting current user with valid authentication."""
         # Mock auth service
-        mock_user = User(
+        mock_user = FakeUser(
             id="user123",
             email="test@example.com",
             timezone="UTC",
             language_preference="en-US",
-            created_at=datetime.now()
+            created_at=_FIXED_NOW
         )
         mock_auth_service.get_user_by_id.return_value = mock_user
         
@@ -225,36 +259,22 @@ class TestAuthEndpoints:
             # For now, we test the service logic directly
             pass
     
-    def test_logout_user(self):
+    def test_logout_user(self, client, authenticated_user, bearer_headers):
         """Test user logout."""
-        # Mock authentication by patching JWT middleware
-        with patch('app.middleware.auth.JWTAuthMiddleware.dispatch') as mock_dispatch:
-            async def mock_auth_dispatch(request, call_next):
-                request.state.user_id = "user123"
-                return await call_next(request)
-            
-            mock_dispatch.side_effect = mock_auth_dispatch
-            
-            response = self.client.post(
-                "/api/v1/auth/logout",
-                headers={"Authorization": "Bearer valid_token"}
-            )
-            
-            # Should return success (token blacklisting is placeholder)
-            assert response.status_code == 200
-            assert "Logged out successfully" in response.json()["message"]
+        response = client.post("/api/v1/auth/logout", headers=bearer_headers)
+        
+        # Should return success (token blacklisting is placeholder)
+        assert response.status_code == 200
+        assert "Logged out successfully" in response.json()["message"]
 
 
 class TestHealthEndpoints:
     """Test health and system endpoints."""
     
-    def setup_method(self):
-        """Set up test client."""
-        self.client = TestClient(app)
-    
-    def test_health_check(self):
+    @pytest.mark.asyncio
+    async def test_health_check(self, aclient):
         """Test health check endpoint."""
-        response = self.client.get("/health")
+        response = await aclient.get("/health")
         
         assert response.status_code == 200
         data = response.json()
@@ -262,9 +282,10 @@ class TestHealthEndpoints:
         assert "timestamp" in data
         assert data["version"] == "1.0.0"
     
-    def test_root_endpoint(self):
+    @pytest.mark.asyncio
+    async def test_root_endpoint(self, aclient):
         """Test root endpoint."""
-        response = self.client.get("/")
+        response = await aclient.get("/")
         
         assert response.status_code == 200
         data = response.json()
@@ -272,9 +293,10 @@ class TestHealthEndpoints:
         assert data["version"] == "1.0.0"
         assert data["docs"] == "/api/v1/docs"
     
-    def test_metrics_endpoint(self):
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint(self, aclient):
         """Test Prometheus metrics endpoint."""
-        response = self.client.get("/metrics")
+        response = await aclient.get("/metrics")
         
         assert response.status_code == 200
         # Should return Prometheus format
@@ -284,43 +306,39 @@ class TestHealthEndpoints:
 class TestMiddlewareIntegration:
     """Test middleware integration with API endpoints."""
     
-    def setup_method(self):
-        """Set up test client."""
-        self.client = TestClient(app)
-    
-    def test_cors_headers(self):
+    def test_cors_headers(self, client):
         """Test CORS headers are added."""
-        response = self.client.options("/health")
+        response = client.options("/health")
         
         # CORS headers should be present
         assert "access-control-allow-origin" in response.headers
         assert "access-control-allow-methods" in response.headers
     
-    def test_security_headers(self):
+    def test_security_headers(self, client):
         """Test security headers are added."""
-        response = self.client.get("/health")
+        response = client.get("/health")
         
         # Security headers should be present
         assert response.headers["x-content-type-options"] == "nosniff"
         assert response.headers["x-frame-options"] == "DENY"
         assert "x-xss-protection" in response.headers
     
-    def test_correlation_id_header(self):
+    def test_correlation_id_header(self, client):
         """Test correlation ID header is added."""
-        response = self.client.get("/health")
+        response = client.get("/health")
         
         # Correlation ID should be present
         assert "x-correlation-id" in response.headers
         correlation_id = response.headers["x-correlation-id"]
         assert len(correlation_id) == 36  # UUID length
     
-    def test_rate_limit_headers(self):
+    def test_rate_limit_headers(self, client):
         """Test rate limit headers are added."""
-        response = self.client.get("/health")
+        response = client.get("/health")
         
         # Rate limit headers should be present for non-excluded endpoints
         # Health endpoint is excluded, so test with a different endpoint
-        response = self.client.get("/")
+        response = client.get("/")
         
         # Note: Rate limiting depends on Redis, so headers may not be present in tests
         # This would need proper Redis mock setup for full testing
@@ -329,34 +347,24 @@ class TestMiddlewareIntegration:
 class TestErrorHandling:
     """Test API error handling."""
     
-    def setup_method(self):
-        """Set up test client."""
-        self.client = TestClient(app)
-    
-    def test_404_not_found(self):
-        """Test 404 error handling."""
-        response = self.client.get("/nonexistent-endpoint")
-        
-        assert response.status_code == 404
-        assert "Not Found" in response.json()["detail"]
-    
-    def test_405_method_not_allowed(self):
-        """Test 405 error handling."""
-        response = self.client.post("/health")  # Health only accepts GET
-        
-        assert response.status_code == 405
-        assert "Method Not Allowed" in response.json()["detail"]
-    
-    def test_422_validation_error(self):
-        """Test validation error handling."""
-        # Send invalid JSON to registration endpoint
-        response = self.client.post(
-            "/api/v1/auth/register",
-            json={"email": "invalid", "password": "short"}
-        )
-        
-        assert response.status_code == 422
-        assert "validation error" in response.json()["detail"][0]["type"]
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("method,url,payload,expected_status,expected_detail", [
+        ("GET", "/nonexistent-endpoint", None, 404, "Not Found"),
+        # Health only accepts GET
+        ("POST", "/health", None, 405, "Method Not Allowed"),
+        # Invalid JSON for the registration endpoint
+        ("POST", "/api/v1/auth/register", {"email": "invalid", "password": "short"}, 422, "validation error"),
+    ])
+    async def test_error_responses(self, aclient, method, url, payload, expected_status, expected_detail):
+        """Test 404, 405 and validation error handling."""
+        response = await aclient.request(method, url, json=payload)
+        
+        assert response.status_code == expected_status
+        detail = response.json()["detail"]
+        if isinstance(detail, list):
+            # Validation errors list the failing fields
+            detail = detail[0]["type"]
+        assert expected_detail in detail
     
     @patch('app.main.logger')
     def test_500_internal_server_error(self, mock_logger):
@@ -369,32 +377,31 @@ class TestErrorHandling:
 class TestOpenAPIDocumentation:
     """Test OpenAPI documentation endpoints."""
     
-    def setup_method(self):
-        """Set up test client."""
-        self.client = TestClient(app)
-    
-    def test_openapi_json(self):
+    def test_openapi_json(self, app, openapi_schema):
         """Test OpenAPI JSON endpoint."""
-        response = self.client.get("/api/v1/openapi.json")
-        
-        assert response.status_code == 200
-        data = response.json()
+        data = openapi_schema
         assert data["info"]["title"] == "Intelligent AI Assistant API"
         assert data["info"]["version"] == "1.0.0"
         assert "paths" in data
         assert "components" in data
+        
+        # The schema is built once and reused for later requests
+        assert app.openapi_schema is not None
+        assert app.openapi() is app.openapi_schema
     
-    def test_swagger_docs(self):
+    @pytest.mark.asyncio
+    async def test_swagger_docs(self, aclient):
         """Test Swagger documentation endpoint."""
-        response = self.client.get("/api/v1/docs")
+        response = await aclient.get("/api/v1/docs")
         
         assert response.status_code == 200
         assert "text/html" in response.headers["content-type"]
         assert "swagger" in response.text.lower()
     
-    def test_redoc_docs(self):
+    @pytest.mark.asyncio
+    async def test_redoc_docs(self, aclient):
         """Test ReDoc documentation endpoint."""
-        response = self.client.get("/api/v1/redoc")
+        response = await aclient.get("/api/v1/redoc")
         
         assert response.status_code == 200
         assert "text/html" in response.headers["content-type"]
@@ -229,6 +229,87 @@ class TestWhatsAppService:
         mock_db.add.assert_called()
         mock_db.commit.assert_called()
     
+    @pytest.mark.asyncio
+    async def test_send_messages_batch(self, whatsapp_service, mock_db, sample_user, sample_thread):
+        """Test sending a batch of WhatsApp messages with one commit."""
+        # execute() is awaited, so its result must be a plain (non-async) mock
+        mock_db.execute.return_value = MagicMock()
+        mock_db.execute.return_value.scalar_one_or_none.return_value = sample_thread
+        
+        whatsapp_service.api.send_text_message = AsyncMock(side_effect=[
+            {"messages": [{"id": "msg_1"}]},
+            Exception("API error"),
+            {"messages": [{"id": "msg_3"}]}
+        ])
+        
+        messages = [
+            (sample_user.id, WhatsAppMessageCreate(
+                recipient="+1234567890",
+                content=f"Reminder {i}",
+                message_type=MessageType.TEXT
+            ))
+            for i in range(3)
+        ]
+        
+        result = await whatsapp_service.send_messages_batch(mock_db, messages)
+        
+        assert result == ["msg_1", None, "msg_3"]
+        assert mock_db.add.call_count == 2
+        mock_db.commit.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_send_messages_batch_new_thread_single_commit(self, whatsapp_service, mock_db, sample_user):
+        """Test that a thread created for a batch is committed with the messages."""
+        # execute() is awaited, so its result must be a plain (non-async) mock
+        mock_db.execute.return_value = MagicMock()
+        mock_db.execute.return_value.scalar_one_or_none.return_value = None
+        
+        whatsapp_service.api.send_text_message = AsyncMock(
+            return_value={"messages": [{"id": "msg_1"}]}
+        )
+        
+        messages = [(sample_user.id, WhatsAppMessageCreate(
+            recipient="+1234567890",
+            content="Reminder",
+            message_type=MessageType.TEXT
+        ))]
+        
+        result = await whatsapp_service.send_messages_batch(mock_db, messages)
+        
+        assert result == ["msg_1"]
+        mock_db.flush.assert_called()
+        mock_db.commit.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_send_messages_batch_store_failure_keeps_sent(self, whatsapp_service, mock_db, sample_user, sample_thread):
+        """Test that a message that fails to store does not drop the rest of the batch."""
+        # execute() is awaited, so its result must be a plain (non-async) mock
+        mock_db.execute.return_value = MagicMock()
+        mock_db.execute.return_value.scalar_one_or_none.return_value = sample_thread
+        
+        whatsapp_service.api.send_text_message = AsyncMock(side_effect=[
+            {"messages": [{"id": "msg_1"}]},
+            {"messages": [{"id": "msg_2"}]}
+        ])
+        
+        messages = [
+            (sample_user.id, WhatsAppMessageCreate(
+                recipient="+1234567890",
+                content=f"Reminder {i}",
+                message_type=MessageType.TEXT
+            ))
+            for i in range(2)
+        ]
+        
+        with patch.object(
+            whatsapp_service, '_record_outbound', side_effect=[Exception("DB error"), MagicMock()]
+        ):
+            result = await whatsapp_service.send_messages_batch(mock_db, messages)
+        
+        assert result == ["msg_1", "msg_2"]
+        mock_db.commit.assert_called_once()
+        mock_db.rollback.assert_not_called()
+        
     @pytest.mark.asyncio
     async def test_process_incoming_message(self, whatsapp_service, mock_db, sample_user, sample_thread):
         """Test processing incoming WhatsApp message."""
@@ -269,6 +350,19 @@ class TestWhatsAppService:
         
         assert result is False
     
+    @pytest.mark.asyncio
+    async def test_get_user_context_sees_opt_out(self, whatsapp_service, mock_db):
+        """Test user context reflects an opt-out on the very next lookup."""
+        mock_db.execute.return_value = MagicMock()
+        mock_db.execute.return_value.scalar_one_or_none.side_effect = [
+            UserSettings(user_id="user_123", whatsapp_opt_in=True), "+1234567890",
+            UserSettings(user_id="user_123", whatsapp_opt_in=False), "+1234567890"
+        ]
+        
+        assert await whatsapp_service.get_user_context(mock_db, "user_123") == ("+1234567890", True)
+        assert await whatsapp_service.get_user_context(mock_db, "user_123") == ("+1234567890", False)
+        assert mock_db.execute.call_count == 4
+    
     @pytest.mark.asyncio
     async def test_handle_opt_in_request_success(self, whatsapp_service, mock_db, sample_user, sample_thread):
         """Test successful opt-in request."""
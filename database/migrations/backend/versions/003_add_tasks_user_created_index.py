@@ -0,0 +1,26 @@
+"""Add composite index on tasks (user_id, created_at)
+
+Revision ID: 003_add_tasks_user_created_index
+Revises: 002_add_password_hash
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003_add_tasks_user_created_index'
+down_revision = '002_add_password_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Supports per-user created_at range scans (daily summaries);
+    # events already have idx_events_user_id_start_time
+    op.create_index('idx_tasks_user_id_created_at', 'tasks', ['user_id', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_tasks_user_id_created_at')
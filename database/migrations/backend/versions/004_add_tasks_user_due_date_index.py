@@ -0,0 +1,25 @@
+"""Add composite index on tasks (user_id, due_date)
+
+Revision ID: 004_add_tasks_user_due_date_index
+Revises: 003_add_tasks_user_created_index
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004_add_tasks_user_due_date_index'
+down_revision = '003_add_tasks_user_created_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Supports the due_date window scans of task reminders
+    op.create_index('idx_tasks_user_id_due_date', 'tasks', ['user_id', 'due_date'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_tasks_user_id_due_date')
@@ -214,10 +214,14 @@ export function useWebSocket(options: UseWebSocketOptions = {}) {
 
       wsRef.current.onmessage = (event) => {
         try {
-          const message: WebSocketMessage = JSON.parse(event.data);
-          console.log('📩 WebSocket message received:', message);
-          setLastMessage(message);
-          onMessage?.(message);
+          // A frame carries either one message or a batch of them
+          const parsed: WebSocketMessage | WebSocketMessage[] = JSON.parse(event.data);
+          const messages = Array.isArray(parsed) ? parsed : [parsed];
+          for (const message of messages) {
+            console.log('📩 WebSocket message received:', message);
+            setLastMessage(message);
+            onMessage?.(message);
+          }
         } catch (error) {
           logError('Failed to parse WebSocket message', error);
         }